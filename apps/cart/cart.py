@@ -1,9 +1,20 @@
 from decimal import Decimal
+from typing import NamedTuple, Optional
 
 from django.conf import settings
+from django.utils.module_loading import import_string
+from django.utils.translation import get_language
 
 from apps.coupons.models import Coupon
-from apps.shop.models import Product
+from apps.shop.models import ProductListing
+
+
+class CartTotals(NamedTuple):
+    """ Immutable totals of a cart, see Cart.get_totals(). """
+    subtotal: Decimal
+    coupon: Optional[Coupon]
+    discount: Decimal
+    total: Decimal
 
 
 class Cart:
@@ -15,33 +26,67 @@ class Cart:
             * Unit Price - 2 Place Decimal.
     Product prices are stored as when the time objects was added to cart. Any
         future price changes do not affects items in the cart.
+    The data is kept by the CART_STORAGE backend, see storage.py.
     """
 
     def __init__(self, request) -> None:
         """ Initialize cart object. """
         self.session = request.session
-        # Get existing session, if not default to empty dict.
-        cart = self.session.get(settings.CART_SESSION_ID)
-        if not cart:
-            cart = self.session[settings.CART_SESSION_ID] = {}
-        self.cart = cart
+        self.storage = import_string(settings.CART_STORAGE)(request)
+        self.cart = self.storage.load()
 
         # Store currently applied coupon
         self.coupon_id = self.session.get("coupon_id")
 
+        # Hydrated items and totals, see get_items() and get_totals()
+        self._items = None
+        self._totals = None
+        # IDs of the products get_items() removed from the cart
+        self.removed = []
+
     def __iter__(self):
         """
         Iterate over products in the cart and retrieve them from the database.
         """
-        product_ids = self.cart.keys()
-        products = Product.objects.filter(id__in=product_ids)
-        cart = self.cart.copy()
-        for product in products.iterator():
-            cart[str(product.id)]["product"] = product
-        for item in iter(cart.values()):
-            item["price"] = Decimal(item["price"])
-            item["total_price"] = item["price"] * item["quantity"]
-            yield item
+        return iter(self.get_items())
+
+    def get_items(self) -> list:
+        """
+        Build the cart items with their products, fetched in one go as
+            ProductListing objects of the active language. The items are
+            kept until the cart is changed, so iterating the cart several
+            times while rendering a page does not query the database again.
+            Products with no listing in the active language can be neither
+            shown nor ordered, they are removed from the cart and their IDs
+            added to self.removed, so the totals match the items.
+
+        Items are new dicts, changing them does not change the cart.
+        """
+        if self._items is None:
+            products = {}
+            if self.cart:
+                products = {
+                    str(product.id): product for product in
+                    ProductListing.objects.filter(
+                        product_id__in=self.cart.keys(),
+                        language_code=get_language()
+                    )
+                }
+            self._items = []
+            for product_id in self.cart.keys() - products.keys():
+                self.storage.remove(product_id)
+                self.cart.pop(product_id, None)
+                self.removed.append(product_id)
+                self._totals = None
+            for product_id, data in self.cart.items():
+                price = Decimal(data["price"])
+                self._items.append({
+                    "product": products[product_id],
+                    "quantity": data["quantity"],
+                    "price": price,
+                    "total_price": price * data["quantity"],
+                })
+        return self._items
 
     def __len__(self):
         """
@@ -50,56 +95,64 @@ class Cart:
         return sum(item["quantity"] for item in self.cart.values())
 
     def save(self) -> None:
-        self.session.modified = True
+        """ Drop hydrated items and totals after a change. """
+        self._items = None
+        self._totals = None
 
     def add(self, product, quantity=1, override_quantity=False):
         """
         Add a product to the cart or updates quantities.
         """
         product_id = str(product.id)
-
-        # For new product addition.
-        if product_id not in self.cart:
-            self.cart[product_id] = {
-                "quantity": 0,
-                "price": str(product.price)
-            }
-
-        if override_quantity:
-            self.cart[product_id]["quantity"] = quantity
-        else:
-            self.cart[product_id]["quantity"] += quantity
+        self.cart[product_id] = self.storage.add(
+            product_id, quantity, str(product.price), override_quantity
+        )
         self.save()
 
     def remove(self, product) -> None:
         """ Removes a product from the cart."""
         product_id = str(product.id)
+        self.storage.remove(product_id)
         self.cart.pop(product_id, None)
         self.save()
 
     def clear(self):
-        cart = self.cart
-        cart.clear()
+        self.storage.clear()
+        self.cart.clear()
+        self.save()
+
+    def get_totals(self) -> CartTotals:
+        """
+        Compute the cart totals once, then reuse them until the cart
+            changes. The coupon is read through the cache, see
+            Coupon.get_cached().
+        """
+        if self._totals is None:
+            subtotal = sum(
+                (Decimal(item["price"]) * item["quantity"]
+                 for item in self.cart.values()),
+                Decimal(0)
+            )
+            coupon = None
+            if self.coupon_id:
+                coupon = Coupon.get_cached(self.coupon_id)
+            discount = Decimal(0)
+            if coupon:
+                discount = (coupon.discount / Decimal(100)) * subtotal
+            self._totals = CartTotals(
+                subtotal, coupon, discount, subtotal - discount
+            )
+        return self._totals
 
     def get_total_price(self):
-        return sum(
-            Decimal(item["price"]) * item["quantity"]
-            for item in self.cart.values()
-        )
+        return self.get_totals().subtotal
 
     @property
     def coupon(self):
-        if self.coupon_id:
-            try:
-                return Coupon.objects.get(id=self.coupon_id)
-            except Coupon.DoesNotExist:
-                pass
-        return None
+        return self.get_totals().coupon
 
     def get_discount(self):
-        if self.coupon:
-            return (self.coupon.discount / Decimal(100)) * self.get_total_price()   # noqa
-        return Decimal(0)
+        return self.get_totals().discount
 
     def get_total_price_after_discount(self):
-        return self.get_total_price() - self.get_discount()
+        return self.get_totals().total
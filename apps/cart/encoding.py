@@ -0,0 +1,64 @@
+import base64
+import struct
+import uuid
+from decimal import Decimal
+
+# Version 1 is the original format, a dict of product ID string ->
+#   {"quantity": int, "price": str}. Version 2 packs every line item into a
+#   fixed size record: binary product UUID, quantity, unit price in cents.
+CART_VERSION = 2
+_ITEM = struct.Struct("!16siq")
+
+
+def to_cents(price) -> int:
+    return int((Decimal(price) * 100).to_integral_value())
+
+
+def from_cents(cents) -> str:
+    return str(Decimal(cents).scaleb(-2))
+
+
+def encode_cart(cart: dict) -> list:
+    """
+    Encode a cart dict in the current version, e.g for the session.
+        Records are base64 encoded to stay JSON serializable.
+
+    :params cart (dict): Product ID string -> {"quantity", "price"}.
+
+    :return (list): [version, payload]
+    """
+    payload = b"".join(
+        _ITEM.pack(
+            uuid.UUID(product_id).bytes, item["quantity"],
+            to_cents(item["price"])
+        )
+        for product_id, item in cart.items()
+    )
+    return [CART_VERSION, base64.b64encode(payload).decode("ascii")]
+
+
+def decode_cart(data) -> dict:
+    """
+    Decode a cart stored by encode_cart(), or in the original format.
+
+    :return (dict): Product ID string -> {"quantity": int, "price": str}.
+    """
+    if isinstance(data, dict):
+        return {
+            product_id: {
+                "quantity": item["quantity"],
+                "price": from_cents(to_cents(item["price"])),
+            }
+            for product_id, item in data.items()
+        }
+    version, payload = data
+    if version != CART_VERSION:
+        raise ValueError(f"Unsupported cart version {version}")
+    return {
+        str(uuid.UUID(bytes=product_id)): {
+            "quantity": quantity, "price": from_cents(cents)
+        }
+        for product_id, quantity, cents in _ITEM.iter_unpack(
+            base64.b64decode(payload)
+        )
+    }
@@ -0,0 +1,135 @@
+import logging
+import struct
+import uuid
+
+from django.conf import settings
+
+from apps.common.redis_pool import get_redis_connection
+
+from .encoding import decode_cart, encode_cart, from_cents, to_cents
+
+logger = logging.getLogger(__name__)
+
+
+class SessionCartStorage:
+    """
+    Keeps the cart in the session, packed by encode_cart(). Carts still in
+        the original dict format are converted when loaded. Every change
+        rewrites the session.
+    """
+
+    def __init__(self, request) -> None:
+        self.session = request.session
+        self.cart = None
+
+    def load(self) -> dict:
+        """
+        Return the cart as a dict of product ID string ->
+            {"quantity": int, "price": str}. Changes must go through the
+            storage methods to be saved. A cart that cannot be decoded,
+            e.g. written by a newer version during a rollback, is logged
+            and replaced by an empty one.
+        """
+        if self.cart is None:
+            data = self.session.get(settings.CART_SESSION_ID)
+            try:
+                self.cart = decode_cart(data) if data else {}
+            except (ValueError, TypeError, struct.error):
+                logger.warning(
+                    "Dropped undecodable cart %r.", data, exc_info=True
+                )
+                self.cart = {}
+            if isinstance(data, dict) and data:
+                self.save()
+        return self.cart
+
+    def save(self) -> None:
+        self.session[settings.CART_SESSION_ID] = encode_cart(self.cart)
+
+    def add(self, product_id, quantity, price, override_quantity=False):
+        """
+        Add quantity of a product, or set it with override_quantity. The
+            price is only stored when the product is new to the cart.
+
+        :return (dict): The updated line item.
+        """
+        item = self.load().setdefault(
+            product_id, {"quantity": 0, "price": from_cents(to_cents(price))}
+        )
+        if override_quantity:
+            item["quantity"] = quantity
+        else:
+            item["quantity"] += quantity
+        self.save()
+        return item
+
+    def remove(self, product_id) -> None:
+        self.load().pop(product_id, None)
+        self.save()
+
+    def clear(self) -> None:
+        self.load().clear()
+        self.save()
+
+
+class RedisCartStorage:
+    """
+    Keeps the cart in a Redis hash, so cart changes only write the line
+        item they touch instead of the whole session:
+            * <product ID> - Quantity, updated with HINCRBY.
+            * <product ID>:price - Unit price when the product was added.
+    The hash expires CART_REDIS_TTL seconds after the last change. The
+        session only holds the hash's key, written once per cart.
+    """
+    session_key = "cart_key"
+
+    def __init__(self, request) -> None:
+        self.session = request.session
+        self.conn = get_redis_connection()
+
+    def get_key(self, create=False):
+        cart_key = self.session.get(self.session_key)
+        if cart_key is None and create:
+            cart_key = self.session[self.session_key] = uuid.uuid4().hex
+        return cart_key and f"cart:{cart_key}"
+
+    def load(self) -> dict:
+        key = self.get_key()
+        if key is None:
+            return {}
+        fields = {
+            field.decode("utf-8"): value.decode("utf-8")
+            for field, value in self.conn.hgetall(key).items()
+        }
+        return {
+            field: {
+                "quantity": int(value),
+                "price": fields[f"{field}:price"],
+            }
+            for field, value in fields.items()
+            if not field.endswith(":price") and f"{field}:price" in fields
+        }
+
+    def add(self, product_id, quantity, price, override_quantity=False):
+        """ See SessionCartStorage.add(). """
+        key = self.get_key(create=True)
+        pipe = self.conn.pipeline(transaction=True)
+        pipe.hsetnx(key, f"{product_id}:price", price)
+        if override_quantity:
+            pipe.hset(key, product_id, quantity)
+        else:
+            pipe.hincrby(key, product_id, quantity)
+        pipe.hmget(key, product_id, f"{product_id}:price")
+        pipe.expire(key, settings.CART_REDIS_TTL)
+        quantity, price = pipe.execute()[2]
+        return {"quantity": int(quantity), "price": price.decode("utf-8")}
+
+    def remove(self, product_id) -> None:
+        key = self.get_key()
+        if key is not None:
+            self.conn.hdel(key, product_id, f"{product_id}:price")
+
+    def clear(self) -> None:
+        key = self.get_key()
+        if key is not None:
+            self.conn.unlink(key)
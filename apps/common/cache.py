@@ -0,0 +1,113 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache.backends import redis as redis_backend
+from django.core.cache.backends.base import DEFAULT_TIMEOUT
+from django.utils.functional import cached_property
+from redis.exceptions import RedisError
+
+from .circuit_breaker import CircuitBreaker
+from .redis_pool import get_connection_pool
+
+logger = logging.getLogger(__name__)
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(location, budget):
+    """
+    The process-wide circuit breaker of a cache server and latency budget.
+    """
+    with _breakers_lock:
+        if (location, budget) not in _breakers:
+            _breakers[(location, budget)] = CircuitBreaker(
+                failure_threshold=settings.REDIS_CACHE_BREAKER_THRESHOLD,
+                reset_timeout=settings.REDIS_CACHE_BREAKER_RESET_TIMEOUT
+            )
+        return _breakers[(location, budget)]
+
+
+class SharedPoolCacheClient(redis_backend.RedisCacheClient):
+    """
+    Cache client drawing connections from the process-wide pools of
+        redis_pool.py, instead of pools of its own per cache and thread.
+    """
+
+    def __init__(self, servers, budget=None, **options):
+        super().__init__(servers, **options)
+        self._budget = budget
+
+    def _get_connection_pool(self, write):
+        index = self._get_connection_pool_index(write)
+        return get_connection_pool(self._budget, self._servers[index])
+
+
+class RedisCache(redis_backend.RedisCache):
+    """
+    Django's Redis cache, pooled with the rest of the Redis users, which
+        fails open:
+         * Reads answer a miss and writes are skipped when Redis fails or
+            is slower than OPTIONS["BUDGET"] seconds.
+         * After REDIS_CACHE_BREAKER_THRESHOLD consecutive failures, Redis
+            is not tried for REDIS_CACHE_BREAKER_RESET_TIMEOUT seconds.
+         * Deletions still raise, a lost invalidation would serve stale
+            entries until they expire.
+    Pool and connection options come from the REDIS_* settings, OPTIONS
+        only take BUDGET. Defaults to REDIS_SOCKET_TIMEOUT.
+    """
+
+    def __init__(self, server, params):
+        super().__init__(server, params)
+        self._class = SharedPoolCacheClient
+        self._budget = self._options.get("BUDGET")
+        self._options = {"budget": self._budget}
+
+    @cached_property
+    def breaker(self):
+        return get_breaker(self._servers[0], self._budget)
+
+    def _fail_open(self, default, method, *args):
+        if not self.breaker.allow():
+            return default
+        try:
+            result = method(*args)
+        except RedisError:
+            self.breaker.record_failure()
+            logger.warning(
+                "Cache server %s failed, treated as a miss.",
+                self._servers[0], exc_info=True
+            )
+            return default
+        except BaseException:
+            # A trial call must never leave the breaker half-open
+            self.breaker.record_failure()
+            raise
+        self.breaker.record_success()
+        return result
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._fail_open(
+            False, super().add, key, value, timeout, version
+        )
+
+    def get(self, key, default=None, version=None):
+        return self._fail_open(default, super().get, key, default, version)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._fail_open(None, super().set, key, value, timeout, version)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._fail_open(False, super().touch, key, timeout, version)
+
+    def get_many(self, keys, version=None):
+        return self._fail_open({}, super().get_many, keys, version)
+
+    def has_key(self, key, version=None):
+        return self._fail_open(False, super().has_key, key, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._fail_open(
+            list(data), super().set_many, data, timeout, version
+        )
@@ -0,0 +1,53 @@
+import threading
+import time
+
+
+class CircuitBreaker:
+    """
+    Stops calling a failing dependency for a while.
+        * Closed - calls go through, consecutive failures are counted.
+        * Open - after failure_threshold failures, calls are refused for
+            reset_timeout seconds.
+        * Half-open - then a single trial call is let through. Its success
+            closes the breaker, its failure opens it again.
+
+    params:failure_threshold (int): Consecutive failures before opening.
+    params:reset_timeout (float): Seconds to stay open before a trial call.
+    """
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = None
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """ Whether a call should be attempted now. """
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and (
+                time.monotonic() - self.opened_at >= self.reset_timeout
+            ):
+                self.state = self.HALF_OPEN
+                return True
+            # Open, or half-open with the trial call still running
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if (self.state == self.HALF_OPEN
+                    or self.failures >= self.failure_threshold):
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
@@ -0,0 +1,114 @@
+import os
+import threading
+
+import redis
+from django.conf import settings
+
+_pools = {}
+_pools_pid = None
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(timeout=None, location=None):
+    """
+    Return a process-wide Redis connection pool, creating it on first use.
+
+    The pools are recreated in a forked child (e.g gunicorn/celery workers)
+        so connections are never shared between processes.
+
+    params:timeout (float, optional): Socket, connect and pool wait timeout
+        in seconds, for callers with a latency budget. Each timeout gets a
+        pool of its own. Defaults to the REDIS_* settings.
+    params:location (str, optional): redis:// URL of another server or
+        database, e.g a cache's LOCATION. Pooled with the same settings.
+        Defaults to REDIS_HOST, REDIS_PORT and REDIS_DB.
+
+    return:(redis.BlockingConnectionPool): Shared connection pool.
+    """
+    global _pools, _pools_pid
+    pid = os.getpid()
+    key = (location, timeout)
+    if _pools_pid != pid or key not in _pools:
+        with _pools_lock:
+            if _pools_pid != pid:
+                _pools = {}
+                _pools_pid = pid
+            if key not in _pools:
+                options = dict(
+                    username=settings.REDIS_USER,
+                    password=settings.REDIS_PASSWORD,
+                    max_connections=settings.REDIS_MAX_CONNECTIONS,
+                    timeout=timeout or settings.REDIS_POOL_TIMEOUT,
+                    socket_timeout=timeout or settings.REDIS_SOCKET_TIMEOUT,
+                    socket_connect_timeout=(
+                        timeout or settings.REDIS_SOCKET_CONNECT_TIMEOUT
+                    ),
+                    health_check_interval=settings.REDIS_HEALTH_CHECK_INTERVAL,
+                )
+                if location is None:
+                    _pools[key] = redis.BlockingConnectionPool(
+                        host=settings.REDIS_HOST,
+                        port=settings.REDIS_PORT,
+                        db=settings.REDIS_DB,
+                        **options
+                    )
+                else:
+                    _pools[key] = redis.BlockingConnectionPool.from_url(
+                        location, **options
+                    )
+    return _pools[key]
+
+
+def get_redis_connection(timeout=None, location=None):
+    """
+    Return a Redis client drawing connections from a shared pool.
+        Clients are cheap, the pool holds the actual sockets.
+
+    params:timeout (float, optional): See get_connection_pool().
+    params:location (str, optional): See get_connection_pool().
+    """
+    return redis.Redis(
+        connection_pool=get_connection_pool(timeout, location)
+    )
+
+
+def _get_stats(pool):
+    created = len(pool._connections)
+    idle = sum(1 for conn in list(pool.pool.queue) if conn is not None)
+    return {
+        "max": pool.max_connections,
+        "created": created,
+        "in_use": created - idle,
+        "idle": idle,
+    }
+
+
+def pool_stats(timeout=None, location=None):
+    """
+    Metrics for a shared connection pool of the current process.
+
+    params:timeout (float, optional): See get_connection_pool().
+    params:location (str, optional): See get_connection_pool().
+
+    return:(dict): max, created, in use and idle connection counts.
+    """
+    pools = _pools if _pools_pid == os.getpid() else {}
+    pool = pools.get((location, timeout))
+    if pool is None:
+        return {"max": settings.REDIS_MAX_CONNECTIONS, "created": 0,
+                "in_use": 0, "idle": 0}
+    return _get_stats(pool)
+
+
+def all_pool_stats():
+    """
+    Metrics for every shared connection pool the current process opened.
+
+    return:(list): pool_stats() dicts, with the pool's location (None for
+        the REDIS_* server) and timeout.
+    """
+    pools = dict(_pools) if _pools_pid == os.getpid() else {}
+    return [
+        {"location": location, "timeout": timeout, **_get_stats(pool)}
+        for (location, timeout), pool in pools.items()
+    ]
@@ -0,0 +1,14 @@
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+
+from .redis_pool import all_pool_stats
+
+
+@staff_member_required
+def redis_pool_stats(request):
+    """
+    Redis connection pool metrics of the process serving the request, see
+        redis_pool.all_pool_stats(). Every worker process has pools of its
+        own, scrapers see one of them per request.
+    """
+    return JsonResponse({"pools": all_pool_stats()})
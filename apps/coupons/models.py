@@ -1,8 +1,12 @@
+from django.conf import settings
+from django.core.cache import cache
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
 
 from apps.common.models import BaseModel
 
+_MISSING = object()
+
 
 class Coupon(BaseModel):
     code = models.CharField(max_length=50, unique=True)
@@ -16,3 +20,26 @@ class Coupon(BaseModel):
 
     def __str__(self) -> str:
         return self.code
+
+    @staticmethod
+    def get_cache_key(coupon_id) -> str:
+        return f"coupon:{coupon_id}"
+
+    @classmethod
+    def get_cached(cls, coupon_id):
+        """
+        Get a coupon by ID through the cache, for carts reading it on every
+            request, in the default cache shared by every process. Missing
+            coupons are cached too. Entries are dropped when saving or
+            deleting the coupon commits, see signals.py.
+
+        :params coupon_id (str): Coupon ID.
+
+        :return (Coupon | None): The coupon, if it exists.
+        """
+        key = cls.get_cache_key(coupon_id)
+        coupon = cache.get(key, _MISSING)
+        if coupon is _MISSING:
+            coupon = cls.objects.filter(id=coupon_id).first()
+            cache.set(key, coupon, settings.COUPON_CACHE_TIMEOUT)
+        return coupon
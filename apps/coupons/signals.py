@@ -0,0 +1,17 @@
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Coupon
+
+
+@receiver([post_save, post_delete], sender=Coupon)
+def invalidate_coupon(sender, instance, **kwargs):
+    """
+    Drop the cached coupon once the change is committed, see
+        Coupon.get_cached(). Dropped earlier, a request could cache the
+        old coupon again before the commit.
+    """
+    key = Coupon.get_cache_key(instance.id)
+    transaction.on_commit(lambda: cache.delete(key))
@@ -60,6 +60,11 @@ def order_pdf(obj):
 order_pdf.short_description = "Invoice"
 
 
+@admin.display(description="Total", ordering="annotated_total")
+def order_total(obj):
+    return obj.get_total_cost()
+
+
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     raw_id_fields = ["product"]
@@ -69,8 +74,12 @@ class OrderItemInline(admin.TabularInline):
 class OrderAdmin(admin.ModelAdmin):
     list_display = [
         "order_no", "first_name", "last_name", "email", "paid",
-        order_payment, "updated", "created", order_detail, order_pdf
+        order_payment, order_total, "updated", "created", order_detail,
+        order_pdf
     ]
     list_filter = ["paid", "created", "updated"]
     inlines = [OrderItemInline]
     actions = [export_to_csv]
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).with_totals()
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.4 on 2026-10-18 09:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0003_order_coupon_order_discount"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="purchases_recorded",
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2.4 on 2026-10-18 09:47
+
+import apps.orders.utils
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("orders", "0004_order_purchases_recorded"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="OrderNoSequence",
+            fields=[
+                (
+                    "length",
+                    models.PositiveSmallIntegerField(
+                        primary_key=True, serialize=False
+                    ),
+                ),
+                ("next_value", models.BigIntegerField(default=0)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name="order",
+            name="order_no",
+            field=models.CharField(
+                default=apps.orders.utils.generate_order_no,
+                max_length=12,
+                unique=True,
+            ),
+        ),
+    ]
@@ -3,6 +3,8 @@ from decimal import Decimal
 from django.conf import settings
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.db import models
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Cast, Coalesce
 from django.utils.translation import gettext_lazy as _
 
 from apps.common.models import BaseModel
@@ -12,9 +14,49 @@ from apps.shop.models import Product
 from .utils import generate_order_no
 
 
+class OrderQuerySet(models.QuerySet):
+
+    def with_totals(self):
+        """
+        Annotate orders with their costs, aggregated by the database:
+            * annotated_subtotal - Cost of the items before discount.
+            * annotated_discount - Coupon discount.
+            * annotated_total - Cost after discount.
+        Order.get_total_cost* and get_discount() use them when present.
+        """
+        amount = models.DecimalField(max_digits=12, decimal_places=2)
+        return self.annotate(
+            annotated_subtotal=Coalesce(
+                Sum(F("items__price") * F("items__quantity"),
+                    output_field=amount),
+                Value(Decimal(0)),
+                output_field=amount
+            )
+        ).annotate(
+            annotated_discount=Cast(
+                F("annotated_subtotal") * F("discount") / Value(Decimal(100)),
+                output_field=amount
+            )
+        ).annotate(
+            annotated_total=Cast(
+                F("annotated_subtotal") - F("annotated_discount"),
+                output_field=amount
+            )
+        )
+
+    def with_items(self):
+        """
+        Prefetch the items with their products and translations, e.g for
+            invoices. Costs are then computed without further queries.
+        """
+        return self.select_related("coupon").prefetch_related(
+            "items__product__translations"
+        )
+
+
 class Order(BaseModel):
     order_no = models.CharField(
-        max_length=5, unique=True, default=generate_order_no
+        max_length=12, unique=True, default=generate_order_no
     )
     stripe_id = models.CharField(max_length=250, blank=True)
     first_name = models.CharField(_("first_name"), max_length=50)
@@ -24,6 +66,8 @@ class Order(BaseModel):
     postal_code = models.CharField(_("postal_code"), max_length=20)
     city = models.CharField(_("city"), max_length=100)
     paid = models.BooleanField(default=False)
+    # Set once the order's products are recorded for recommendations.
+    purchases_recorded = models.BooleanField(default=False, editable=False)
 
     # Coupon Related - discount is preserved even if Coupon object is deleted.
     coupon = models.ForeignKey(
@@ -35,6 +79,8 @@ class Order(BaseModel):
         default=0
     )
 
+    objects = OrderQuerySet.as_manager()
+
     class Meta:
         ordering = ["-created"]
         indexes = [
@@ -45,17 +91,28 @@ class Order(BaseModel):
         return f"Order {self.id}"
 
     def get_total_cost_before_discount(self) -> int:
+        """
+        Use the OrderQuerySet.with_totals() annotation if present, else the
+            items, prefetched or not.
+        """
+        if hasattr(self, "annotated_subtotal"):
+            return self.annotated_subtotal
         return sum(item.get_cost() for item in self.items.all())
 
-    def get_discount(self) -> int:
-        total_cost = self.get_total_cost_before_discount()
+    def get_discount(self, total_cost=None) -> int:
+        if total_cost is None:
+            if hasattr(self, "annotated_discount"):
+                return self.annotated_discount
+            total_cost = self.get_total_cost_before_discount()
         if self.discount:
             return total_cost * (self.discount / Decimal(100))
         return Decimal(0)
 
     def get_total_cost(self) -> int:
+        if hasattr(self, "annotated_total"):
+            return self.annotated_total
         total_cost = self.get_total_cost_before_discount()
-        return total_cost - self.get_discount()
+        return total_cost - self.get_discount(total_cost)
 
     def get_stripe_url(self):
         if not self.stripe_id:
@@ -67,6 +124,18 @@ class Order(BaseModel):
         return f"https://dashboard.stripe.com{path}payments/{self.stripe_id}"
 
 
+class OrderNoSequence(models.Model):
+    """
+    Next value of the order number sequence for each order number length,
+        see utils.generate_order_no().
+    """
+    length = models.PositiveSmallIntegerField(primary_key=True)
+    next_value = models.BigIntegerField(default=0)
+
+    def __str__(self) -> str:
+        return f"{self.length} characters: {self.next_value}"
+
+
 class OrderItem(BaseModel):
     order = models.ForeignKey(
         Order, related_name="items", on_delete=models.CASCADE
@@ -1,8 +1,17 @@
+import logging
+
 from celery import shared_task
 from django.core.mail import send_mail
-from .models import Order
+from django.db import transaction
+from redis.exceptions import RedisError
+
+from apps.shop.recommender import Recommender
+
+from .models import Order, OrderItem
 from django.conf import settings
 
+logger = logging.getLogger(__name__)
+
 
 @shared_task
 def order_created(order_id):
@@ -22,3 +31,44 @@ def order_created(order_id):
         [order.email]
     )
     return mail_sent
+
+
+@shared_task(autoretry_for=(RedisError,), retry_backoff=True, max_retries=5)
+def record_order_purchases(order_id):
+    """
+    Task to record the products of a paid order as bought together, for
+        product recommendations.
+    The order is claimed by flagging purchases_recorded in the same
+        transaction as the Redis write, so webhook retries or duplicate
+        tasks never count an order twice, while a failed write is retried.
+        The write itself is idempotent, see Recommender.record_order(), in
+        case it went through but the claim was rolled back.
+    While rebuild_recommendations runs, the claim is rolled back and the
+        order left to the rebuild, which records it once done.
+    Cached suggestions are invalidated after the claim commits, a failure
+        there only leaves them until they expire.
+    """
+    with transaction.atomic():
+        claimed = Order.objects.filter(
+            id=order_id, paid=True, purchases_recorded=False
+        ).update(purchases_recorded=True)
+        if not claimed:
+            return False
+        recommender = Recommender()
+        # Checked after claiming, the rebuild waits for claimed orders
+        if recommender.is_rebuilding():
+            transaction.set_rollback(True)
+            return False
+        product_ids = list(
+            OrderItem.objects.filter(order_id=order_id)
+            .values_list("product_id", flat=True)
+        )
+        recommender.record_order(order_id, product_ids)
+    try:
+        recommender.invalidate_suggestions(product_ids)
+    except RedisError:
+        logger.warning(
+            "Suggestions of order %s not invalidated.", order_id,
+            exc_info=True
+        )
+    return True
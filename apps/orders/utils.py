@@ -1,15 +1,110 @@
-import random
-import string
+import os
+import threading
+
+from django.conf import settings
+from django.db import transaction
+
+# Human-readable and case-insensitive, without the ambiguous 1/I/0/O.
+ALPHABET = "23456789ABCDEFGHJKLMNPQRSTUVWXYZ"
+_MULTIPLIERS = (0x9E3779B97F4A7C15, 0xBF58476D1CE4E5B9)
+
+_blocks = {}
+_blocks_pid = None
+_blocks_lock = threading.Lock()
+
+
+def scramble(value, length):
+    """
+    Map a sequence value to another value of the same range, one to one, so
+        consecutive orders don't get consecutive numbers. Each round is a
+        multiplication by an odd number and a xorshift, both reversible
+        modulo the range.
+
+    :params value (int): Value in [0, 32 ** length).
+    :params length (int): Number of characters of the order number.
+
+    :return (int): Scrambled value, in [0, 32 ** length).
+    """
+    bits = 5 * length
+    mask = (1 << bits) - 1
+    for multiplier in _MULTIPLIERS:
+        value = (value * multiplier) & mask
+        value ^= value >> (bits // 2 + 1)
+    return value
+
+
+def encode(value, length):
+    """ Write value in base 32 with ALPHABET, on length characters. """
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[index])
+    return "".join(reversed(chars))
+
+
+def allocate_block(length, size):
+    """
+    Reserve the next size values of the order number sequence of the given
+        length. Allocations are serialized by a row lock on the sequence.
+
+    :return (tuple): Reserved values, as a [start, end) range.
+    """
+    # Models import this module for the Order.order_no default.
+    from .models import OrderNoSequence
+
+    with transaction.atomic():
+        sequence, _ = OrderNoSequence.objects.select_for_update(
+        ).get_or_create(length=length)
+        start = sequence.next_value
+        end = min(start + size, len(ALPHABET) ** length)
+        if start >= end:
+            raise RuntimeError(
+                f"Order numbers of {length} characters are exhausted, "
+                "increase ORDER_NO_LENGTH."
+            )
+        sequence.next_value = end
+        sequence.save(update_fields=["next_value"])
+    return start, end
+
+
+def _add_block(length, start, end):
+    with _blocks_lock:
+        if _blocks_pid == os.getpid():
+            _blocks.setdefault(length, [start, end])
 
 
 def generate_order_no():
     """
-    Generate a random 5 character alphanumeric string.
+    Generate a unique ORDER_NO_LENGTH character order number.
     Constraints considered:
-        -  Human-readable.
+        - Human-readable.
         - Allow case-insensitivity by picking only uppercase.
         - Reduce ambiguity by eliminating 1/I/O/0.
+        - Unique without retries: numbers are values of a database sequence,
+            reserved ORDER_NO_BLOCK_SIZE at a time per process, scrambled
+            and encoded with ALPHABET.
+
+    Blocks reserved inside a transaction are only reused once it commits,
+        a rollback would release them to other processes.
     """
-    pool = string.ascii_uppercase + string.digits
-    pool = list(set(pool) - {'1', 'I', '0', 'O'})
-    return "".join(random.choice(pool) for x in range(5))
+    global _blocks, _blocks_pid
+    length = settings.ORDER_NO_LENGTH
+    with _blocks_lock:
+        if _blocks_pid != os.getpid():
+            # Blocks must not be shared with forked processes.
+            _blocks = {}
+            _blocks_pid = os.getpid()
+        block = _blocks.get(length)
+        if block and block[0] < block[1]:
+            value = block[0]
+            block[0] += 1
+        else:
+            _blocks.pop(length, None)
+            value, end = allocate_block(length, settings.ORDER_NO_BLOCK_SIZE)
+            if transaction.get_connection().in_atomic_block:
+                transaction.on_commit(
+                    lambda: _add_block(length, value + 1, end)
+                )
+            else:
+                _blocks[length] = [value + 1, end]
+    return encode(scramble(value, length), length)
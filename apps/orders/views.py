@@ -1,10 +1,12 @@
 import weasyprint
 from django.conf import settings
 from django.contrib.admin.views.decorators import staff_member_required
+from django.db import transaction
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
 from django.urls import reverse
+from django.utils.translation import gettext as _
 
 from apps.cart.cart import Cart
 
@@ -18,26 +20,38 @@ def order_create(request):
     if request.method == "POST":
 
         form = OrderCreateForm(request.POST)
+        # Hydrate the cart before opening the transaction.
+        items = cart.get_items()
+        if cart.removed:
+            # The customer must see the order they are placing.
+            form.add_error(None, _(
+                "Some products are no longer available and were removed "
+                "from your cart, please review your order."
+            ))
         if form.is_valid():
             order = form.save(commit=False)
-            if cart.coupon:
-                order.coupon = cart.coupon
-                order.discount = cart.coupon.discount
-            order.save()
-            for item in iter(cart):
-                # TODO: Use BulkCreate instead?
-                OrderItem.objects.create(
-                    order=order,
-                    product=item.get("product"),
-                    price=item.get("price"),
-                    quantity=item.get("quantity")
+            coupon = cart.get_totals().coupon
+            if coupon:
+                order.coupon = coupon
+                order.discount = coupon.discount
+            with transaction.atomic():
+                order.save()
+                OrderItem.objects.bulk_create([
+                    OrderItem(
+                        order=order,
+                        product_id=item["product"].id,
+                        price=item["price"],
+                        quantity=item["quantity"]
+                    )
+                    for item in items
+                ])
+                # Send email once the order is committed
+                transaction.on_commit(
+                    lambda: order_created.delay(order.id)
                 )
             # Clear cart after saving order.
             cart.clear()
 
-            # Send email on order creation
-            order_created.delay(order.id)
-
             # Set order in session
             request.session['order_no'] = order.order_no
 
@@ -56,7 +70,7 @@ def order_create(request):
 
 @staff_member_required
 def admin_order_detail(request, order_no):
-    order = get_object_or_404(Order, order_no=order_no)
+    order = get_object_or_404(Order.objects.with_items(), order_no=order_no)
 
     context = {"order": order}
     return render(request, "admin/orders/order/detail.html", context)
@@ -64,7 +78,7 @@ def admin_order_detail(request, order_no):
 
 @staff_member_required
 def admin_order_pdf(request, order_no):
-    order = get_object_or_404(Order, order_no=order_no)
+    order = get_object_or_404(Order.objects.with_items(), order_no=order_no)
     html = render_to_string(
         "orders/order/invoice_template.html",
         {"order": order}
@@ -16,7 +16,7 @@ def send_payment_receipt(order_id):
         along with a receipt.
 
     """
-    order = Order.objects.get(id=order_id)
+    order = Order.objects.with_items().get(id=order_id)
 
     # Create invoice email
     client_reference = order.first_name or order.last_name or "there"
@@ -16,7 +16,7 @@ stripe.api_version = settings.STRIPE_API_VERSION
 @csrf_exempt
 def payment_process(request):
     order_no = request.session.get('order_no', None)
-    order = get_object_or_404(Order, order_no=order_no)
+    order = get_object_or_404(Order.objects.with_items(), order_no=order_no)
 
     if request.method == "POST":
         success_url = request.build_absolute_uri(reverse("payment:completed"))
@@ -32,7 +32,7 @@ def payment_process(request):
         }
 
         # Add order items
-        for item in order.items.all().iterator():
+        for item in order.items.all():
             session_data.get("line_items").append({
                 "price_data": {
                     "unit_amount": int(item.price * Decimal("100")),
@@ -4,6 +4,7 @@ from django.http import HttpResponse
 from django.views.decorators.csrf import csrf_exempt
 
 from apps.orders.models import Order
+from apps.orders.tasks import record_order_purchases
 
 from .tasks import send_payment_receipt
 
@@ -38,5 +39,7 @@ def stripe_webhook(request):
             order.save()
 
             send_payment_receipt.delay(order.id)
+            # Feed recommendations off the request thread
+            record_order_purchases.delay(order.id)
 
     return HttpResponse(status=200)
@@ -1,6 +1,18 @@
 from django.apps import AppConfig
+from django.conf import settings
+from django.utils.module_loading import import_string
 
 
 class ShopConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "apps.shop"
+
+    def ready(self):
+        from . import signals  # noqa: F401
+
+        # Load the recommender snapshot before Redis fails, not when it does.
+        for backend in (settings.RECOMMENDER_BACKEND,
+                        settings.RECOMMENDER_FALLBACK_BACKEND):
+            backend = import_string(backend) if backend else None
+            if hasattr(backend, "preload"):
+                backend().preload()
@@ -0,0 +1,32 @@
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+VERSION_KEY = "catalog:version"
+
+
+def get_catalog_cache():
+    return caches[settings.CATALOG_CACHE_ALIAS]
+
+
+def get_catalog_version() -> str:
+    """
+    Current catalog version, part of the key of every cached catalog
+        fragment. Bumping it makes all of them stale at once.
+    """
+    cache = get_catalog_cache()
+    version = cache.get(VERSION_KEY)
+    if version is None:
+        cache.add(VERSION_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_KEY)
+    return version
+
+
+def bump_catalog_version() -> None:
+    """
+    Drop all cached catalog fragments, see signals.py. The version is
+        deleted rather than overwritten: the catalog cache skips failing
+        writes, but deletions raise.
+    """
+    get_catalog_cache().delete(VERSION_KEY)
@@ -0,0 +1,16 @@
+from django.conf import settings
+from django.utils.functional import SimpleLazyObject
+
+from .catalog import get_catalog_version
+
+
+def catalog(request):
+    """
+    Key parts of cached catalog fragments, e.g
+        {% cache catalog_cache_timeout "name" catalog_version ... %}
+    The version is only read by templates using it.
+    """
+    return {
+        "catalog_version": SimpleLazyObject(get_catalog_version),
+        "catalog_cache_timeout": settings.CATALOG_CACHE_TIMEOUT,
+    }
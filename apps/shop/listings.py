@@ -0,0 +1,87 @@
+from itertools import islice
+
+from django.conf import settings
+from django.db import transaction
+from parler.utils.i18n import get_active_language_choices
+
+from .models import Product, ProductListing
+from .search import update_search_vectors
+
+
+def get_listings(product):
+    """
+    Build the listings of a product, one per language of LANGUAGES, using
+        the first translation available among the language and its
+        fallbacks. Translations should be prefetched.
+
+    yield:(ProductListing): Unsaved listings.
+    """
+    translations = {t.language_code: t for t in product.translations.all()}
+    category_translations = {
+        t.language_code: t for t in product.category.translations.all()
+    }
+    for language, _ in settings.LANGUAGES:
+        choices = get_active_language_choices(language)
+        translation = next(
+            (translations[code] for code in choices if code in translations),
+            None
+        )
+        if translation is None:
+            continue
+        category = next(
+            (category_translations[code] for code in choices
+             if code in category_translations),
+            None
+        )
+        yield ProductListing(
+            product=product,
+            language_code=language,
+            name=translation.name,
+            slug=translation.slug,
+            description=translation.description,
+            price=product.price,
+            available=product.available,
+            image=product.image.name,
+            category_id=product.category_id,
+            category_name=category.name if category else "",
+            category_slug=category.slug if category else "",
+            created=product.created,
+        )
+
+
+def refresh_listings(product_ids=None, batch_size=500, progress=None):
+    """
+    Rebuild the listings of some or all products, search vectors included.
+
+    :params product_ids (iterable, optional): Product IDs, or a queryset of
+        them. Defaults to all products.
+    :params batch_size (int, optional): Products written per batch.
+    :params progress (callable, optional): Called with the running count of
+        listings after each batch.
+
+    :return (int): Number of listings written.
+    """
+    products = Product.objects.select_related("category").prefetch_related(
+        "translations", "category__translations"
+    )
+    listings = ProductListing.objects.all()
+    if product_ids is not None:
+        products = products.filter(id__in=product_ids)
+        listings = listings.filter(product_id__in=product_ids)
+
+    count = 0
+    with transaction.atomic():
+        listings.delete()
+        products = products.iterator(chunk_size=batch_size)
+        while batch := list(islice(products, batch_size)):
+            created = ProductListing.objects.bulk_create([
+                listing for product in batch
+                for listing in get_listings(product)
+            ])
+            update_search_vectors(ProductListing.objects.filter(
+                product_id__in=[product.id for product in batch]
+            ))
+            count += len(created)
+            if progress:
+                progress(count)
+    return count
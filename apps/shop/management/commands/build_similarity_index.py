@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from apps.shop.similarity import METRICS, build_similarity_index
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute the top similar products of every product from paid "
+        "orders, for apps.shop.similarity.SimilarityBackend."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--metric", choices=METRICS, default="cosine")
+        parser.add_argument(
+            "--top-k", type=int, default=None,
+            help="Neighbours kept per product."
+        )
+        parser.add_argument(
+            "--min-count", type=int, default=1,
+            help="Ignore pairs bought together fewer times."
+        )
+        parser.add_argument(
+            "--batch-size", type=int, default=1024,
+            help="Products whose similarities are computed at once."
+        )
+        parser.add_argument("--path", default=None)
+
+    def handle(self, *args, **options):
+        snapshot = build_similarity_index(
+            path=options["path"],
+            metric=options["metric"],
+            top_k=options["top_k"],
+            min_count=options["min_count"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {len(snapshot.product_ids)} products "
+            f"({len(snapshot.indices)} neighbours)."
+        ))
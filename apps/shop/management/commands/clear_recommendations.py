@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.shop.recommender import Recommender
+
+
+class Command(BaseCommand):
+    help = "Delete all product co-purchase data used for recommendations."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=1000,
+            help="Keys scanned and unlinked per batch."
+        )
+
+    def handle(self, *args, **options):
+        def progress(deleted):
+            self.stdout.write(f"Deleted {deleted} keys...")
+
+        deleted = Recommender().clear_purchases(
+            batch_size=options["batch_size"], progress=progress
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Cleared recommendations, {deleted} keys.")
+        )
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from apps.shop.listings import refresh_listings
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-language product listings from the catalog."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size", type=int, default=500,
+            help="Products read and written per batch."
+        )
+
+    def handle(self, *args, **options):
+        def progress(count):
+            self.stdout.write(f"Wrote {count} listings...")
+
+        count = refresh_listings(
+            batch_size=options["batch_size"], progress=progress
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f"Rebuilt product listings, {count} rows.")
+        )
@@ -0,0 +1,141 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.orders.models import Order, OrderItem
+from apps.orders.tasks import record_order_purchases
+from apps.shop.recommender import Recommender
+
+# Seconds the rebuild flag outlives the last processed chunk, in case the
+# command is killed.
+REBUILD_TIMEOUT = 10 * 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Rebuild product co-purchase data used for recommendations from "
+        "paid orders."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=1000,
+            help="Orders read and flushed to Redis per chunk."
+        )
+        parser.add_argument(
+            "--shadow", action="store_true",
+            help=(
+                "Build into a shadow keyspace and swap it in atomically at "
+                "the end, live recommendations keep working meanwhile."
+            )
+        )
+
+    def handle(self, *args, **options):
+        live = Recommender()
+        live.start_rebuild(REBUILD_TIMEOUT)
+        try:
+            orders = self.rebuild(
+                live, options["chunk_size"], options["shadow"]
+            )
+        finally:
+            live.finish_rebuild()
+            replayed = self.replay()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rebuilt recommendations from {orders} orders, "
+                f"{replayed} orders paid meanwhile queued."
+            )
+        )
+
+    def rebuild(self, live, chunk_size, shadow):
+        """
+        Rebuild from the orders paid up to a cutoff. Taken once in-flight
+            record_order_purchases tasks committed, it claims every paid order
+            not recorded yet; until the rebuild finishes, tasks leave orders
+            to it and nothing else is claimed, so the claimed orders are
+            exactly the ones counted in the rebuilt data.
+
+        :return (int): Number of orders rebuilt from.
+        """
+        with transaction.atomic():
+            # Waits for tasks that claimed an order before the rebuild flag
+            # was set, their Redis writes are done once they commit.
+            list(
+                Order.objects.select_for_update()
+                .filter(paid=True, purchases_recorded=False)
+                .values_list("id", flat=True)
+            )
+            Order.objects.filter(paid=True, purchases_recorded=False).update(
+                purchases_recorded=True
+            )
+
+        if shadow:
+            target = Recommender(namespace="rebuild:product")
+            # Leftovers of an interrupted rebuild
+            target.clear_purchases()
+        else:
+            target = live
+            live.clear_purchases()
+
+        orders = 0
+        for order_ids, products, bought_at in self.iter_chunks(chunk_size):
+            target.bulk_product_ids_bought(
+                products, batch_size=len(order_ids), bought_at=bought_at
+            )
+            live.start_rebuild(REBUILD_TIMEOUT)
+            orders += len(order_ids)
+            self.stdout.write(f"Processed {orders} orders...")
+
+        if shadow:
+            live.swap_in(target)
+        return orders
+
+    def replay(self):
+        """
+        Queue record_order_purchases for the orders paid after the cutoff,
+            left unrecorded by their tasks during the rebuild. Claims make
+            tasks still queued for them harmless.
+
+        :return (int): Number of orders queued.
+        """
+        order_ids = Order.objects.filter(
+            paid=True, purchases_recorded=False
+        ).values_list("id", flat=True)
+        replayed = 0
+        for order_id in order_ids.iterator():
+            record_order_purchases.delay(order_id)
+            replayed += 1
+        return replayed
+
+    def iter_chunks(self, chunk_size):
+        """
+        Stream the orders claimed at the cutoff in keyset-paginated chunks,
+            without instantiating models.
+
+        yield:(tuple): Order IDs of the chunk, product ID lists per order and
+            the matching order creation dates.
+        """
+        last_id = None
+        while True:
+            orders = Order.objects.filter(
+                paid=True, purchases_recorded=True
+            ).order_by("id")
+            if last_id is not None:
+                orders = orders.filter(id__gt=last_id)
+            created = dict(orders.values_list("id", "created")[:chunk_size])
+            if not created:
+                return
+            order_ids = list(created)
+            products = defaultdict(list)
+            items = OrderItem.objects.filter(
+                order_id__in=order_ids
+            ).values_list("order_id", "product_id")
+            for order_id, product_id in items.iterator():
+                products[order_id].append(product_id)
+            yield (
+                order_ids,
+                list(products.values()),
+                [created[order_id] for order_id in products]
+            )
+            last_id = order_ids[-1]
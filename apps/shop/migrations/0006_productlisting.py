@@ -0,0 +1,119 @@
+# Generated by Django 4.2.4 on 2026-10-18 09:57
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from parler.utils.i18n import get_active_language_choices
+
+
+def backfill_listings(apps, schema_editor):
+    """
+    Same as apps.shop.listings.refresh_listings(), with historical models.
+    """
+    Product = apps.get_model("shop", "Product")
+    ProductListing = apps.get_model("shop", "ProductListing")
+
+    def first(translations, choices):
+        return next(
+            (translations[code] for code in choices if code in translations),
+            None
+        )
+
+    products = Product.objects.select_related("category").prefetch_related(
+        "translations", "category__translations"
+    )
+    listings = []
+    for product in products.iterator(chunk_size=500):
+        translations = {
+            t.language_code: t for t in product.translations.all()
+        }
+        category_translations = {
+            t.language_code: t for t in product.category.translations.all()
+        }
+        for language, _ in settings.LANGUAGES:
+            choices = get_active_language_choices(language)
+            translation = first(translations, choices)
+            if translation is None:
+                continue
+            category = first(category_translations, choices)
+            listings.append(ProductListing(
+                product_id=product.id,
+                language_code=language,
+                name=translation.name,
+                slug=translation.slug,
+                description=translation.description,
+                price=product.price,
+                available=product.available,
+                image=product.image.name,
+                category_id=product.category_id,
+                category_name=category.name if category else "",
+                category_slug=category.slug if category else "",
+                created=product.created,
+            ))
+        if len(listings) >= 500:
+            ProductListing.objects.bulk_create(listings)
+            listings = []
+    ProductListing.objects.bulk_create(listings)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shop", "0005_alter_producttranslation_slug"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ProductListing",
+            fields=[
+                (
+                    "listing_id",
+                    models.BigAutoField(primary_key=True, serialize=False),
+                ),
+                ("language_code", models.CharField(max_length=15)),
+                ("name", models.CharField(max_length=200)),
+                ("slug", models.SlugField(db_index=False, max_length=200)),
+                ("description", models.TextField(blank=True)),
+                (
+                    "price",
+                    models.DecimalField(decimal_places=2, max_digits=10),
+                ),
+                ("available", models.BooleanField(default=True)),
+                (
+                    "image",
+                    models.ImageField(
+                        blank=True, upload_to="products/%Y/%m/%d"
+                    ),
+                ),
+                ("category_name", models.CharField(max_length=150)),
+                (
+                    "category_slug",
+                    models.SlugField(db_index=False, max_length=150),
+                ),
+                ("created", models.DateTimeField()),
+                (
+                    "category",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="listings",
+                        to="shop.category",
+                    ),
+                ),
+                (
+                    "product",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="listings",
+                        to="shop.product",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="productlisting",
+            constraint=models.UniqueConstraint(
+                fields=("product", "language_code"),
+                name="unique_product_listing",
+            ),
+        ),
+        migrations.RunPython(backfill_listings, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.4 on 2026-10-18 10:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shop", "0006_productlisting"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="productlisting",
+            name="product",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="listings",
+                to="shop.product",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productlisting",
+            index=models.Index(
+                condition=models.Q(("available", True)),
+                fields=["language_code", "-created", "-product"],
+                name="listing_available_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="productlisting",
+            index=models.Index(
+                condition=models.Q(("available", True)),
+                fields=["language_code", "category", "-created", "-product"],
+                name="listing_category_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 4.2.4 on 2026-10-18 10:32
+
+import django.contrib.postgres.search
+from django.conf import settings
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# GIN indexes aren't declared on the model, SQLite can't build them, nor
+# rebuild the table when later migrations alter it.
+SEARCH_INDEXES = [
+    "CREATE INDEX listing_search_idx ON shop_productlisting "
+    "USING gin (search_vector) WHERE available",
+    "CREATE INDEX listing_name_trgm_idx ON shop_productlisting "
+    "USING gin (name gin_trgm_ops) WHERE available",
+]
+
+
+def create_search_indexes(apps, schema_editor):
+    """
+    Build the search indexes and vectors on PostgreSQL, same as
+        apps.shop.search.update_search_vectors().
+    """
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for sql in SEARCH_INDEXES:
+        schema_editor.execute(sql)
+
+    SearchVector = django.contrib.postgres.search.SearchVector
+    ProductListing = apps.get_model("shop", "ProductListing")
+    for language, _ in settings.LANGUAGES:
+        config = settings.SHOP_SEARCH_CONFIGS.get(language, "simple")
+        ProductListing.objects.filter(language_code=language).update(
+            search_vector=(
+                SearchVector("name", weight="A", config=config)
+                + SearchVector("description", weight="B", config=config)
+            )
+        )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    schema_editor.execute("DROP INDEX IF EXISTS listing_search_idx")
+    schema_editor.execute("DROP INDEX IF EXISTS listing_name_trgm_idx")
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shop", "0007_alter_productlisting_product_and_more"),
+    ]
+
+    operations = [
+        # Only runs on PostgreSQL.
+        TrigramExtension(),
+        migrations.AddField(
+            model_name="productlisting",
+            name="search_vector",
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
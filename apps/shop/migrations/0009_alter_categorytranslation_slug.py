@@ -0,0 +1,22 @@
+# Generated by Django 4.2.4 on 2026-10-18 10:22
+
+import apps.shop.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("shop", "0008_productlisting_search_vector"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="categorytranslation",
+            name="slug",
+            field=models.SlugField(
+                max_length=150,
+                unique=True,
+                validators=[apps.shop.models.validate_category_slug],
+            ),
+        ),
+    ]
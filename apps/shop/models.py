@@ -1,3 +1,4 @@
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.core.validators import MinValueValidator
 from django.db import models
@@ -6,11 +7,24 @@ from parler.models import TranslatableModel, TranslatedFields
 
 from apps.common.models import BaseModel
 
+# Paths of shop/urls.py matched before category slugs, a category using one
+# would be unreachable.
+RESERVED_CATEGORY_SLUGS = {"search"}
+
+
+def validate_category_slug(value):
+    if value in RESERVED_CATEGORY_SLUGS:
+        raise ValidationError(
+            "Slug [{}] is reserved, pick another one.".format(value)
+        )
+
 
 class Category(BaseModel, TranslatableModel):
     translations = TranslatedFields(
         name=models.CharField(max_length=150, null=False),
-        slug=models.SlugField(max_length=150, unique=True),
+        slug=models.SlugField(
+            max_length=150, unique=True, validators=[validate_category_slug]
+        ),
     )
 
     class Meta:
@@ -71,3 +85,75 @@ class Product(BaseModel, TranslatableModel):
     def save(self):
         super().save()
         self.clean()
+
+
+class ProductListing(models.Model):
+    """
+    Denormalized copy of a product in one language, with its translation
+        and category, read by the catalog, cart and recommendations instead
+        of joining products with their translations. There is a listing for
+        every product and language of LANGUAGES, using the translation
+        fallbacks of parler.
+    Listings are kept up to date by signals.py, and can be rebuilt with the
+        rebuild_product_listings command.
+    """
+    # The id attribute is the product's ID, see below.
+    listing_id = models.BigAutoField(primary_key=True)
+    # Indexed by unique_product_listing.
+    product = models.ForeignKey(
+        Product, related_name="listings", on_delete=models.CASCADE,
+        db_index=False
+    )
+    language_code = models.CharField(max_length=15)
+    name = models.CharField(max_length=200)
+    slug = models.SlugField(max_length=200, db_index=False)
+    description = models.TextField(blank=True)
+    price = models.DecimalField(max_digits=10, decimal_places=2)
+    available = models.BooleanField(default=True)
+    image = models.ImageField(upload_to="products/%Y/%m/%d", blank=True)
+    category = models.ForeignKey(
+        Category, related_name="listings", on_delete=models.CASCADE
+    )
+    category_name = models.CharField(max_length=150)
+    category_slug = models.SlugField(max_length=150, db_index=False)
+    created = models.DateTimeField()
+    # Weighted name and description, on PostgreSQL only, see search.py.
+    # Its GIN index and the name's trigram index are created by migration
+    # 0008_productlisting_search_vector.
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["product", "language_code"],
+                name="unique_product_listing"
+            ),
+        ]
+        # Newest available listings first, per language and optionally
+        # category, as paginated by product_list.
+        indexes = [
+            models.Index(
+                fields=["language_code", "-created", "-product"],
+                condition=models.Q(available=True),
+                name="listing_available_idx"
+            ),
+            models.Index(
+                fields=["language_code", "category", "-created", "-product"],
+                condition=models.Q(available=True),
+                name="listing_category_idx"
+            ),
+        ]
+
+    def __str__(self) -> str:
+        return self.name
+
+    @property
+    def id(self):
+        """ Product ID, so listings stand in for products. """
+        return self.product_id
+
+    def get_absolute_url(self):
+        return reverse("shop:product_detail", args=[self.product_id, self.slug])
+
+    def get_category_url(self):
+        return reverse("shop:product_cat_list", args=[self.category_slug])
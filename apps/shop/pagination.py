@@ -0,0 +1,105 @@
+import base64
+import uuid
+from datetime import datetime
+
+from django.db.models import Q
+from django.http import Http404
+
+
+def encode_cursor(obj) -> str:
+    """ Opaque cursor of an object's (created, id) position. """
+    value = f"{obj.created.isoformat()}|{obj.id}"
+    return base64.urlsafe_b64encode(value.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """
+    :return (tuple): (created, id) of the cursor.
+
+    raise:Http404: If the cursor is malformed.
+    """
+    try:
+        created, id = base64.urlsafe_b64decode(
+            cursor.encode("ascii")
+        ).decode("utf-8").split("|")
+        return datetime.fromisoformat(created), uuid.UUID(id)
+    except ValueError:
+        raise Http404("Invalid page cursor.")
+
+
+class KeysetPage:
+    """
+    A page of objects, newest first, with the cursors of its neighbours.
+
+    params:object_list (list): Objects of the page.
+    params:next_cursor (str): Cursor of the next page, None on the last.
+    params:previous_cursor (str): Cursor of the previous page, None on the
+        first.
+    """
+
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self.next_cursor is not None
+
+    def has_previous(self) -> bool:
+        return self.previous_cursor is not None
+
+
+def paginate_keyset(queryset, page_size, after=None, before=None,
+                    key="id"):
+    """
+    Paginate a queryset on (created, id), newest first. Pages start right
+        after or before a cursor instead of at an offset, so every page is
+        one indexed range read however deep it is, and rows added meanwhile
+        don't shift pages.
+
+    params:queryset (QuerySet): Objects with created and id attributes.
+    params:page_size (int): Objects per page.
+    params:after (str, optional): Cursor the page follows.
+    params:before (str, optional): Cursor the page precedes.
+    params:key (str, optional): Field holding the id attribute, e.g
+        product_id for ProductListing. Defaults to id.
+
+    return:(KeysetPage): The page.
+    """
+    if before:
+        created, id = decode_cursor(before)
+        objects = list(
+            queryset.filter(
+                Q(created__gt=created)
+                | Q(created=created, **{f"{key}__gt": id})
+            ).order_by("created", key)[:page_size + 1]
+        )
+        has_previous = len(objects) > page_size
+        objects = objects[:page_size][::-1]
+        has_next = True
+    else:
+        queryset = queryset.order_by("-created", f"-{key}")
+        if after:
+            created, id = decode_cursor(after)
+            queryset = queryset.filter(
+                Q(created__lt=created)
+                | Q(created=created, **{f"{key}__lt": id})
+            )
+        objects = list(queryset[:page_size + 1])
+        has_next = len(objects) > page_size
+        objects = objects[:page_size]
+        has_previous = bool(after)
+
+    if not objects:
+        return KeysetPage(objects)
+    return KeysetPage(
+        objects,
+        next_cursor=encode_cursor(objects[-1]) if has_next else None,
+        previous_cursor=encode_cursor(objects[0]) if has_previous else None
+    )
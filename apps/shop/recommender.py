@@ -1,22 +1,148 @@
-import redis
+import hashlib
+import logging
+import math
+import time
+import uuid
+from collections import Counter, defaultdict
+from itertools import islice, repeat
+
 from django.conf import settings
+from django.core.cache import caches
+from django.utils.module_loading import import_string
+from django.utils.translation import get_language
+from redis.exceptions import RedisError
+
+from apps.common.circuit_breaker import CircuitBreaker
+from apps.common.redis_pool import get_redis_connection
+
+from .models import ProductListing
+
+logger = logging.getLogger(__name__)
+
+# Guards suggestion reads from Redis, see Recommender.get_breaker()
+_breaker = None
 
-from .models import Product
+# Union the co-purchase sets of several products, drop the products
+#   themselves and return the top-N (member, score) pairs. The temporary key
+#   only lives inside the script, which runs atomically, so nothing is left
+#   behind if the caller goes away.
+#   With time-decay on (rate > 0), each set is weighted by its decay since
+#   its anchor so scores of all sets are comparable.
+#   KEYS: [tmp_key, anchors_key, product_key, ...]
+#   ARGV: [max_results, min_score, now, rate, product_id, ...]
+SUGGEST_MANY_SCRIPT = """
+local tmp_key = KEYS[1]
+local args = {'ZUNIONSTORE', tmp_key, #KEYS - 2, unpack(KEYS, 3)}
+local now = tonumber(ARGV[3])
+local rate = tonumber(ARGV[4])
+if rate > 0 then
+    table.insert(args, 'WEIGHTS')
+    for i = 5, #ARGV do
+        local anchor = tonumber(redis.call('HGET', KEYS[2], ARGV[i])) or now
+        table.insert(
+            args, string.format('%.17g', math.exp(-rate * (now - anchor)))
+        )
+    end
+end
+redis.call(unpack(args))
+if #ARGV > 4 then
+    redis.call('ZREM', tmp_key, unpack(ARGV, 5))
+end
+local result = redis.call(
+    'ZREVRANGEBYSCORE', tmp_key, '+inf', ARGV[2],
+    'WITHSCORES', 'LIMIT', 0, tonumber(ARGV[1])
+)
+redis.call('DEL', tmp_key)
+return result
+"""
+
+# Add time-decayed increments to one product's sorted set. Scores of a set
+#   are stored relative to its anchor timestamp: an increment made at `now`
+#   weighs exp(rate * (now - anchor)), which keeps old scores untouched until
+#   COMPACT_SCRIPT rebases them on a new anchor.
+#   KEYS: [anchors_key, product_key]
+#   ARGV: [product_id, now, rate, with_id, amount, ...]
+INCREMENT_SCRIPT = """
+local now = tonumber(ARGV[2])
+local anchor = tonumber(redis.call('HGET', KEYS[1], ARGV[1]))
+if not anchor then
+    anchor = now
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+end
+local weight = math.exp(tonumber(ARGV[3]) * (now - anchor))
+for i = 4, #ARGV, 2 do
+    redis.call(
+        'ZINCRBY', KEYS[2],
+        string.format('%.17g', tonumber(ARGV[i + 1]) * weight), ARGV[i]
+    )
+end
+return 1
+"""
+
+# Compact one product's sorted set:
+#   - With time-decay on, rescale scores to `now` (ZUNIONSTORE of the key
+#     into itself with a weight), move its anchor to `now` and drop pairs
+#     whose score decayed below min_score.
+#   - Trim it to its max_related highest scores (0 for no cap).
+#   KEYS: [anchors_key, product_key]
+#   ARGV: [product_id, now, rate, max_related, min_score]
+COMPACT_SCRIPT = """
+local now = tonumber(ARGV[2])
+local rate = tonumber(ARGV[3])
+if rate > 0 then
+    local anchor = tonumber(redis.call('HGET', KEYS[1], ARGV[1]))
+    if anchor and anchor < now then
+        redis.call(
+            'ZUNIONSTORE', KEYS[2], 1, KEYS[2], 'WEIGHTS',
+            string.format('%.17g', math.exp(-rate * (now - anchor)))
+        )
+    end
+    redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+    redis.call('ZREMRANGEBYSCORE', KEYS[2], '-inf', '(' .. ARGV[5])
+end
+local max_related = tonumber(ARGV[4])
+if max_related > 0 then
+    redis.call('ZREMRANGEBYRANK', KEYS[2], 0, -(max_related + 1))
+end
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    redis.call('HDEL', KEYS[1], ARGV[1])
+end
+return 1
+"""
 
 
 class Recommender:
     """
     Stores product purchases and retrieve product suggestions for a given
         product or products.
+
+    params:namespace (str, optional): Key prefix. A separate namespace holds
+        a shadow copy of the data while it is rebuilt, see swap_in().
+        Defaults to "product".
+
+    Scores are raw co-purchase counts unless RECOMMENDER_DECAY_HALF_LIFE is
+        set, in which case each purchase's weight halves every half-life
+        (days). compact_purchases() rescales and trims the sorted sets.
+
+    Suggestion reads must answer within RECOMMENDER_TIMEOUT. When Redis
+        fails or is too slow they are served by RECOMMENDER_FALLBACK_BACKEND,
+        and a circuit breaker skips Redis for a while after repeated failures.
+        Setting RECOMMENDER_BACKEND serves them from another backend, e.g
+        apps.shop.similarity.SimilarityBackend, instead of Redis.
     """
-    def __init__(self):
-        self.conn = redis.Redis(
-            host=settings.REDIS_HOST,
-            port=settings.REDIS_PORT,
-            db=settings.REDIS_DB,
-            username=settings.REDIS_USER,
-            password=settings.REDIS_PASSWORD
+    def __init__(self, namespace="product"):
+        self.namespace = namespace
+        # Connections come from the process-wide pools.
+        self.conn = get_redis_connection()
+        self.read_conn = get_redis_connection(
+            timeout=settings.RECOMMENDER_TIMEOUT
+        )
+        self.suggest_many_script = self.conn.register_script(
+            SUGGEST_MANY_SCRIPT
         )
+        self.increment_script = self.conn.register_script(INCREMENT_SCRIPT)
+        self.compact_script = self.conn.register_script(COMPACT_SCRIPT)
+        self.cache = caches[settings.RECOMMENDER_CACHE_ALIAS]
 
     def get_product_key(self, id: str):
         """
@@ -27,7 +153,48 @@ class Recommender:
 
         return:(str): Products's Redis key -> product:[id]:purchased_with
         """
-        return f"product:{str(id)}:purchased_with"
+        return f"{self.namespace}:{str(id)}:purchased_with"
+
+    def get_anchors_key(self):
+        """
+        Redis key of the hash holding each product's decay anchor timestamp.
+
+        return:(str): product:decay:anchors
+        """
+        return f"{self.namespace}:decay:anchors"
+
+    @staticmethod
+    def get_decay_rate():
+        """
+        Exponential decay rate per second, 0 when decay is disabled.
+        """
+        half_life = settings.RECOMMENDER_DECAY_HALF_LIFE
+        if not half_life:
+            return 0
+        return math.log(2) / (half_life * 24 * 60 * 60)
+
+    def get_rebuild_key(self):
+        """
+        Redis key flagging a running rebuild of this recommender's data.
+
+        return:(str): product:rebuild:running
+        """
+        return f"{self.namespace}:rebuild:running"
+
+    def start_rebuild(self, timeout):
+        """
+        Flag a running rebuild, record_order_purchases leaves orders to it
+            meanwhile. The flag expires after timeout seconds, so a killed
+            rebuild does not hold orders back for good; call it again to
+            extend it.
+        """
+        self.conn.set(self.get_rebuild_key(), 1, ex=timeout)
+
+    def finish_rebuild(self):
+        self.conn.unlink(self.get_rebuild_key())
+
+    def is_rebuilding(self) -> bool:
+        return bool(self.conn.exists(self.get_rebuild_key()))
 
     def products_bought(self, products):
         """
@@ -38,78 +205,680 @@ class Recommender:
          * Get the product's Redis key using get_product_id()
          * Increment score of each product_id in the sorted set
 
+        All increments for the order are sent in a single transactional
+            pipeline, i.e one round-trip regardless of the order size.
+
         params:products (list): List of Product objects
         """
-        product_ids = [str(p.id) for p in products]
-        for product_id in product_ids:
-            for with_id in product_ids:
-                # Get other products bought with each product
-                if product_id != with_id:
-                    self.conn.zincrby(
-                        self.get_product_key(product_id), 1, with_id)
+        self.bulk_products_bought([products])
+
+    def bulk_products_bought(self, orders, batch_size=500):
+        """
+        Given an iterable of orders, each a list of Product objects bought
+            together, record their co-purchases.
+         * Pair increments are folded in memory so each (product, with)
+            pair is written once per batch with its summed score.
+         * Each batch of orders is flushed in one transactional pipeline.
+
+        Intended for backfills, where orders can be a generator.
+
+        params:orders (iterable): Lists of Product objects.
+        params:batch_size (int, optional): Orders per pipeline.
+            Defaults to 500.
+        """
+        self.bulk_product_ids_bought(
+            ([p.id for p in products] for products in orders), batch_size
+        )
+
+    def bulk_product_ids_bought(self, orders, batch_size=500,
+                                bought_at=None):
+        """
+        Same as bulk_products_bought(), for orders given as lists of product
+            IDs, e.g straight from OrderItem.values_list().
+
+        params:orders (iterable): Lists of product IDs.
+        params:batch_size (int, optional): Orders per pipeline.
+            Defaults to 500.
+        params:bought_at (iterable, optional): Purchase datetime of each
+            order, used to decay historical orders. Defaults to now.
+        """
+        now = time.time()
+        if bought_at is None:
+            orders = ((product_ids, now) for product_ids in orders)
+        else:
+            orders = zip(orders, (date.timestamp() for date in bought_at))
+        rate = self.get_decay_rate()
+        while True:
+            batch = list(islice(orders, batch_size))
+            if not batch:
+                break
+            self._flush_pair_counts(self.get_pair_counts(
+                ([str(id) for id in product_ids] for product_ids, _ in batch),
+                weights=(
+                    math.exp(-rate * (now - timestamp))
+                    for _, timestamp in batch
+                ) if rate else None
+            ), now)
+
+    @staticmethod
+    def get_pair_counts(orders, weights=None):
+        """
+        Given an iterable of orders, each a list of product IDs, count how
+            many times each ordered pair of distinct products was bought
+            together.
+
+        params:orders (iterable): Lists of product ID strings.
+        params:weights (iterable, optional): Weight of each order.
+            Defaults to 1 per order.
+
+        return:(Counter): (product_id, with_id) -> count
+        """
+        counts = Counter()
+        if weights is None:
+            weights = repeat(1)
+        for product_ids, weight in zip(orders, weights):
+            product_ids = set(product_ids)
+            for product_id in product_ids:
+                for with_id in product_ids:
+                    # Get other products bought with each product
+                    if product_id != with_id:
+                        counts[(product_id, with_id)] += weight
+        return counts
+
+    def get_order_key(self, order_id):
+        """
+        Redis key marking an order's purchases as recorded.
+
+        return:(str): product:order:[id]:recorded
+        """
+        return f"{self.namespace}:order:{str(order_id)}:recorded"
+
+    def record_order(self, order_id, product_ids):
+        """
+        Record the products of one order as bought together, at most once.
+            The increments and a marker key for the order are written in
+            one MULTI/EXEC transaction WATCHing the marker, and orders
+            already marked are skipped. Retrying after a failed EXEC, or a
+            lost reply, never counts an order twice; markers expire after
+            RECOMMENDER_ORDER_MARKER_TTL seconds.
+        Cached suggestions are left alone, see invalidate_suggestions().
+
+        params:order_id (uuid): Order ID.
+        params:product_ids (list): IDs of the order's products.
+
+        return:(bool): Whether this call recorded the order.
+        """
+        key = self.get_order_key(order_id)
+        pipe = self.conn.pipeline(transaction=True)
+        try:
+            pipe.watch(key)
+            if pipe.exists(key):
+                return False
+            pipe.multi()
+            pipe.set(key, 1, ex=settings.RECOMMENDER_ORDER_MARKER_TTL)
+            self._queue_pair_counts(
+                pipe,
+                self.get_pair_counts([[str(id) for id in product_ids]]),
+                time.time()
+            )
+            pipe.execute()
+        finally:
+            pipe.reset()
+        return True
+
+    def _flush_pair_counts(self, counts, now):
+        """
+        Write folded pair counts to Redis in one transactional pipeline.
+        """
+        if not counts:
+            return
+        pipe = self.conn.pipeline(transaction=True)
+        self._queue_pair_counts(pipe, counts, now)
+        pipe.execute()
+        self.invalidate_suggestions({product_id for product_id, _ in counts})
+
+    def _queue_pair_counts(self, pipe, counts, now):
+        """
+        Queue the increments of folded pair counts on a pipeline. With decay
+            on, each product's increments go through INCREMENT_SCRIPT,
+            weighted from its anchor to now.
+        """
+        rate = self.get_decay_rate()
+        if rate:
+            increments = defaultdict(list)
+            for (product_id, with_id), count in counts.items():
+                increments[product_id] += [with_id, count]
+            for product_id, args in increments.items():
+                self.increment_script(
+                    keys=[
+                        self.get_anchors_key(),
+                        self.get_product_key(product_id)
+                    ],
+                    args=[product_id, now, rate, *args],
+                    client=pipe
+                )
+        else:
+            for (product_id, with_id), count in counts.items():
+                pipe.zincrby(self.get_product_key(product_id), count, with_id)
+
+    def get_version_key(self, id: str):
+        """
+        Cache key holding the version token of a product's suggestions.
+        """
+        return f"recommender:version:{str(id)}"
+
+    def get_generation_key(self):
+        """
+        Cache key holding the version token of every suggestion list of this
+            namespace.
+        """
+        return f"recommender:generation:{self.namespace}"
+
+    def get_versions(self, product_ids: list):
+        """
+        Get the version tokens of the given products' suggestions, creating
+            tokens for products that have none (never cached, expired or
+            invalidated). Each token is prefixed with the namespace's
+            generation token.
+        Tokens are read in one round-trip and missing ones written in
+            another, whatever the number of products. Readers racing to
+            create a token may overwrite each other's, which only costs
+            them a cache miss.
+
+        :return (list): Version tokens, in product_ids order.
+        """
+        generation_key = self.get_generation_key()
+        keys = [self.get_version_key(id) for id in product_ids]
+        versions = self.cache.get_many(keys + [generation_key])
+        missing = {
+            key: uuid.uuid4().hex
+            for key in keys + [generation_key] if key not in versions
+        }
+        if missing:
+            self.cache.set_many(missing)
+            versions.update(missing)
+        generation = versions[generation_key]
+        return [f"{generation}:{versions[key]}" for key in keys]
+
+    def invalidate_suggestions(self, product_ids):
+        """
+        Drop cached suggestions for any product set including one of the
+            given products, by discarding their version tokens.
+        """
+        self.cache.delete_many(
+            [self.get_version_key(id) for id in product_ids]
+        )
+
+    def invalidate_all_suggestions(self):
+        """
+        Drop every cached suggestion list by discarding the generation token.
+            Clearing the cache would flush the whole cache server, the other
+            caches included.
+        """
+        self.cache.delete(self.get_generation_key())
+
+    def get_cache_key(self, product_ids: list, max_results, min_score):
+        """
+        Build the cache key of a suggestion list. Keys are made from the
+            sorted product IDs, their version tokens and the active language,
+            so the same cart in any order shares an entry.
+        """
+        product_ids = sorted(product_ids)
+        return self._build_cache_key(
+            product_ids, self.get_versions(product_ids), max_results, min_score
+        )
+
+    def _build_cache_key(self, product_ids, versions, max_results, min_score):
+        digest = hashlib.sha1(
+            ":".join(product_ids + versions).encode("utf-8")
+        ).hexdigest()
+        return (
+            f"recommender:suggest:{get_language()}:{max_results}:"
+            f"{min_score}:{digest}"
+        )
 
-    def suggest_products_for(self, products: list, max_results=6):
+    def suggest_products_for(self, products: list, max_results=6,
+                             min_score=None):
         """
         Given a list of Product objects,
-            - If one product given, use ZRANGE to get IDs of products bought
-                together ordered by frequency of being bought together.
-            - If multiple products given, store them in a temporary Redis key,
-                -> use ZUNIONSTORE to create a sorted set with the given keys
-                as well as the aggreggated sum of scores of the elememnts in
-                the new Redis key.
-                -> use ZREM to remove the product we are generating suggestions
-                for.
-                -> use ZRANGE as above.
+            - If one product given, use ZRANGE to get the top IDs of products
+                bought together ordered by frequency of being bought together.
+            - If multiple products given, run SUGGEST_MANY_SCRIPT which
+                server-side:
+                -> uses ZUNIONSTORE to create a temporary sorted set with
+                the aggreggated sum of scores of the given products' keys.
+                -> uses ZREM to remove the products we are generating
+                suggestions for.
+                -> returns only the top max_results IDs with their scores and
+                deletes the temporary key, all in one atomic call.
             - Finally, get Product objects using IDs
 
         !IMPORTANT - IDs on this project use uuid4s, so yeah...should be fun :)
 
+        Only max_results IDs, plus RECOMMENDER_OVERFETCH spares to stand in
+            for products that fail to hydrate, are read from Redis.
+
+        Hydrated suggestions are cached per product set and language, see
+            get_cache_key(). Purchases invalidate the affected entries.
+
         :params products (list): Product objects to get suggestions for.
         :params max_results (int, optional): Maximum suggestions. Defaults to 6.
+        :params min_score (float, optional): Ignore products bought together
+            fewer times than this. Defaults to no threshold.
 
         :return (list): Suggested Products objects
         """
         product_ids = [str(p.id) for p in products]
-        if len(products) == 1:
-            # One product only
-            suggestions = self.conn.zrange(
-                self.get_product_key(product_ids[0]),
-                0, -1, desc=True
-            )[:max_results]
-        else:   # Multiple products
-            # Generate temporary key
-            flat_ids = "".join([str(id) for id in product_ids])
-            tmp_key = f"tmp_{flat_ids}"
-
-            # Combine scores of all products and store
-            #   resulting sorted set in temporary key
-            keys = [self.get_product_key(id) for id in product_ids]
-            self.conn.zunionstore(tmp_key, keys)
-
-            # Remove IDs for the product we are generating suggestions for
-            self.conn.zrem(tmp_key, *product_ids)
-
-            # Get the product IDs with their score, descending order
-            suggestions = self.conn.zrange(
-                tmp_key, 0, -1, desc=True)[:max_results]
-
-            # Remove the temporary key
-            self.conn.delete(tmp_key)
-        suggested_products_ids = [id.decode('utf-8') for id in suggestions]
-
-        # Get suggested products and sort by order of appearance
-        suggested_products = list(Product.objects.filter(
-            id__in=suggested_products_ids
-        ))
-        suggested_products.sort(
-            key=lambda x: suggested_products_ids.index(str(x.id))
-        )
+        cache_key = self.get_cache_key(product_ids, max_results, min_score)
+        suggested_products = self.cache.get(cache_key)
+        if suggested_products is not None:
+            return suggested_products
+
+        suggestions = [
+            id for id, score in self.get_scored_suggestions(
+                product_ids,
+                max_results + settings.RECOMMENDER_OVERFETCH,
+                min_score
+            )
+        ]
+        suggested_products = self.hydrate(suggestions, max_results)
+        self.cache.set(cache_key, suggested_products)
         return suggested_products
 
-    def clear_purchases(self):
+    def suggest_products_for_many(self, products: list, max_results=6,
+                                  min_score=None):
+        """
+        Given a list of Product objects, get suggestions for each of them
+            individually, e.g for "frequently bought with" badges on listing
+            pages. Same results as calling suggest_products_for([product])
+            for each product, sharing its cache entries, but with:
+            - one cache read for all products,
+            - one pipelined Redis round-trip for the cache misses,
+            - one hydration query for the union of suggested IDs.
+
+        :params products (list): Product objects to get suggestions for.
+        :params max_results (int, optional): Maximum suggestions per product.
+            Defaults to 6.
+        :params min_score (float, optional): See suggest_products_for().
+
+        :return (dict): Product ID string -> suggested ProductListing
+            objects.
+        """
+        product_ids = list(dict.fromkeys(str(p.id) for p in products))
+        versions = self.get_versions(product_ids)
+        cache_keys = {
+            id: self._build_cache_key([id], [version], max_results, min_score)
+            for id, version in zip(product_ids, versions)
+        }
+        cached = self.cache.get_many(cache_keys.values())
+        suggestions = {
+            id: cached[key] for id, key in cache_keys.items() if key in cached
+        }
+
+        missing = [id for id in product_ids if id not in suggestions]
+        if missing:
+            ranked = self.get_scored_suggestions_many(
+                missing,
+                max_results + settings.RECOMMENDER_OVERFETCH,
+                min_score
+            )
+            hydrated = self.hydrate_many(
+                {id: [with_id for with_id, _ in ranked[id]] for id in missing},
+                max_results
+            )
+            self.cache.set_many(
+                {cache_keys[id]: hydrated[id] for id in missing}
+            )
+            suggestions.update(hydrated)
+        return suggestions
+
+    def hydrate_many(self, ranked: dict, max_results=6):
+        """
+        Same as hydrate() for several ranked lists at once, with a single
+            query for the union of their IDs.
+
+        :params ranked (dict): Key -> ranked product ID strings.
+        :params max_results (int, optional): Maximum products per list.
+            Defaults to 6.
+
+        :return (dict): Key -> ProductListing objects
+        """
+        product_ids = {id for ids in ranked.values() for id in ids}
+        products = {
+            str(product.id): product for product in
+            ProductListing.objects.filter(
+                product_id__in=product_ids, language_code=get_language(),
+                available=True
+            )
+        } if product_ids else {}
+        return {
+            key: [products[id] for id in ids if id in products][:max_results]
+            for key, ids in ranked.items()
+        }
+
+    def hydrate(self, product_ids: list, max_results=6):
+        """
+        Given ranked product IDs, get the available products in rank order
+            as ProductListing objects of the active language, in a single
+            query.
+            Unavailable or deleted products are skipped and their places
+            taken by the next-ranked IDs.
+
+        :params product_ids (list): Ranked product ID strings.
+        :params max_results (int, optional): Maximum products. Defaults to 6.
+
+        :return (list): ProductListing objects
+        """
+        positions = {id: index for index, id in enumerate(product_ids)}
+        products = list(
+            ProductListing.objects.filter(
+                product_id__in=product_ids, language_code=get_language(),
+                available=True
+            )
+        )
+        products.sort(key=lambda x: positions[str(x.id)])
+        return products[:max_results]
+
+    @staticmethod
+    def get_breaker():
+        """
+        The process-wide circuit breaker guarding suggestion reads.
+        """
+        global _breaker
+        if _breaker is None:
+            _breaker = CircuitBreaker(
+                failure_threshold=settings.RECOMMENDER_BREAKER_THRESHOLD,
+                reset_timeout=settings.RECOMMENDER_BREAKER_RESET_TIMEOUT
+            )
+        return _breaker
+
+    def get_fallback(self):
+        """
+        The backend answering when Redis can't, any object implementing
+            get_scored_suggestions() like Recommender does.
+        """
+        return import_string(settings.RECOMMENDER_FALLBACK_BACKEND)()
+
+    def get_scored_suggestions(self, product_ids: list, max_results=6,
+                               min_score=None):
+        """
+        Given product IDs, get the IDs of the products most bought together
+            with them, from RECOMMENDER_BACKEND when set, else from Redis or
+            from the fallback backend if Redis is failing, see
+            get_redis_suggestions().
+
+        :params product_ids (list): Product ID strings.
+        :params max_results (int, optional): Maximum suggestions. Defaults to 6.
+        :params min_score (float, optional): Lowest score to return.
+
+        :return (list): (id, score) tuples, highest score first.
+        """
+        return self._read_suggestions(
+            "get_scored_suggestions", self.get_redis_suggestions,
+            product_ids, max_results, min_score
+        )
+
+    def get_scored_suggestions_many(self, product_ids: list, max_results=6,
+                                    min_score=None):
+        """
+        Same as get_scored_suggestions() for each of the given products
+            individually.
+
+        :return (dict): Product ID -> (id, score) tuples.
+        """
+        return self._read_suggestions(
+            "get_scored_suggestions_many", self.get_redis_suggestions_many,
+            product_ids, max_results, min_score
+        )
+
+    def _read_suggestions(self, method, redis_method, *args):
+        """
+        Call method on RECOMMENDER_BACKEND when set, else redis_method behind
+            the circuit breaker, falling back to method on the fallback
+            backend.
+        """
+        if settings.RECOMMENDER_BACKEND:
+            backend = import_string(settings.RECOMMENDER_BACKEND)()
+            return getattr(backend, method)(*args)
+        breaker = self.get_breaker()
+        if breaker.allow():
+            try:
+                suggestions = redis_method(*args)
+            except RedisError as e:
+                breaker.record_failure()
+                logger.warning("Recommender falling back: %r", e)
+            except BaseException:
+                # Not a Redis failure, but a trial call must never leave the
+                # breaker half-open, refusing calls for good.
+                breaker.record_failure()
+                raise
+            else:
+                breaker.record_success()
+                return suggestions
+        return getattr(self.get_fallback(), method)(*args)
+
+    def get_redis_suggestions_many(self, product_ids: list, max_results=6,
+                                   min_score=None):
+        """
+        Read the top of the sorted sets of several products in one pipelined
+            round-trip. Thresholds are applied to the top members, which
+            gives the same result as ZREVRANGEBYSCORE ... LIMIT.
+
+        :return (dict): Product ID -> (id, score) tuples.
+        """
+        if max_results <= 0:
+            return {id: [] for id in product_ids}
+        now = time.time()
+        rate = self.get_decay_rate()
+        pipe = self.read_conn.pipeline(transaction=False)
+        for id in product_ids:
+            if rate:
+                pipe.hget(self.get_anchors_key(), id)
+            pipe.zrange(
+                self.get_product_key(id), 0, max_results - 1,
+                desc=True, withscores=True
+            )
+        results = iter(pipe.execute())
+        suggestions = {}
+        for id in product_ids:
+            factor = 1
+            if rate:
+                anchor = next(results)
+                factor = math.exp(-rate * (now - float(anchor or now)))
+            suggestions[id] = [
+                (with_id.decode("utf-8"), score * factor)
+                for with_id, score in next(results)
+                if min_score is None or score * factor >= min_score
+            ]
+        return suggestions
+
+    def get_redis_suggestions(self, product_ids: list, max_results=6,
+                              min_score=None):
+        """
+        Given product IDs, get the IDs of the products most bought together
+            with them, from Redis.
+            - For one product, read the top of its sorted set, bounded with
+                ZRANGE or ZREVRANGEBYSCORE ... LIMIT when a threshold is set.
+                With decay on, the top is read along with the product's
+                anchor and scores are decayed to now before thresholding.
+            - For several products, use SUGGEST_MANY_SCRIPT.
+
+        :params product_ids (list): Product ID strings.
+        :params max_results (int, optional): Maximum suggestions. Defaults to 6.
+        :params min_score (float, optional): Lowest score to return.
+
+        :return (list): (id, score) tuples, highest score first.
+        """
+        if max_results <= 0:
+            return []
+        now = time.time()
+        rate = self.get_decay_rate()
+        if len(product_ids) == 1 and rate:
+            pipe = self.read_conn.pipeline(transaction=False)
+            pipe.hget(self.get_anchors_key(), product_ids[0])
+            pipe.zrange(
+                self.get_product_key(product_ids[0]), 0, max_results - 1,
+                desc=True, withscores=True
+            )
+            anchor, suggestions = pipe.execute()
+            factor = math.exp(-rate * (now - float(anchor or now)))
+            return [
+                (id.decode("utf-8"), score * factor)
+                for id, score in suggestions
+                if min_score is None or score * factor >= min_score
+            ]
+        if len(product_ids) == 1:
+            key = self.get_product_key(product_ids[0])
+            if min_score is None:
+                suggestions = self.read_conn.zrange(
+                    key, 0, max_results - 1, desc=True, withscores=True
+                )
+            else:
+                suggestions = self.read_conn.zrevrangebyscore(
+                    key, "+inf", min_score, start=0, num=max_results,
+                    withscores=True
+                )
+            return [(id.decode("utf-8"), score) for id, score in suggestions]
+
+        # Short, unique temporary key regardless of the number of products
+        digest = hashlib.sha1(
+            "".join(sorted(product_ids)).encode("utf-8")
+        ).hexdigest()
+        keys = [f"tmp:suggest:{digest}", self.get_anchors_key()]
+        keys += [self.get_product_key(id) for id in product_ids]
+        result = self.suggest_many_script(
+            keys=keys,
+            args=[
+                max_results,
+                "-inf" if min_score is None else min_score,
+                now,
+                rate,
+                *product_ids
+            ],
+            client=self.read_conn
+        )
+        return [
+            (result[i].decode("utf-8"), float(result[i + 1]))
+            for i in range(0, len(result), 2)
+        ]
+
+    def clear_purchases(self, batch_size=1000, progress=None):
         """
         Clear recommendations.
+         * Walk every product:*:purchased_with key with a SCAN cursor, so
+            keys of deleted products are found too.
+         * UNLINK keys in batches, Redis reclaims memory in the background.
+
+        :params batch_size (int, optional): Keys per SCAN/UNLINK batch.
+            Defaults to 1000.
+        :params progress (callable, optional): Called with the running count
+            of deleted keys after each batch.
+
+        :return (int): Number of keys deleted.
+        """
+        deleted = 0
+        keys = []
+        for key in self.conn.scan_iter(
+            match=self.get_product_key("*"), count=batch_size
+        ):
+            keys.append(key)
+            if len(keys) >= batch_size:
+                deleted += self.conn.unlink(*keys)
+                keys = []
+                if progress:
+                    progress(deleted)
+        if keys:
+            deleted += self.conn.unlink(*keys)
+            if progress:
+                progress(deleted)
+        self.conn.unlink(self.get_anchors_key())
+        self.invalidate_all_suggestions()
+        return deleted
+
+    def compact_purchases(self, max_related=None, batch_size=500,
+                          progress=None):
         """
-        products = Product.objects.values_list('id', flat=True)
-        for id in products.iterator():
-            self.conn.delete(self.get_product_key(id))
+        Bound the size of every product:*:purchased_with sorted set.
+         * With decay on, rescale scores to now and drop pairs decayed below
+            RECOMMENDER_DECAY_MIN_SCORE.
+         * Keep only the max_related highest scores of each set.
+         Keys are walked with SCAN and compacted by COMPACT_SCRIPT, one
+            pipeline per batch.
+
+        :params max_related (int, optional): Top-K cap per product.
+            Defaults to RECOMMENDER_MAX_RELATED, 0 for no cap.
+        :params batch_size (int, optional): Keys per batch. Defaults to 500.
+        :params progress (callable, optional): Called with the running count
+            of compacted keys after each batch.
+
+        :return (int): Number of keys compacted.
+        """
+        if max_related is None:
+            max_related = settings.RECOMMENDER_MAX_RELATED
+        now = time.time()
+        rate = self.get_decay_rate()
+        # product:<id>:purchased_with -> <id>
+        start = len(self.namespace) + 1
+        end = -len(":purchased_with")
+        compacted = 0
+        pipe = self.conn.pipeline(transaction=False)
+        for key in self.conn.scan_iter(
+            match=self.get_product_key("*"), count=batch_size
+        ):
+            product_id = key.decode("utf-8")[start:end]
+            self.compact_script(
+                keys=[self.get_anchors_key(), key],
+                args=[
+                    product_id, now, rate, max_related,
+                    settings.RECOMMENDER_DECAY_MIN_SCORE
+                ],
+                client=pipe
+            )
+            compacted += 1
+            if compacted % batch_size == 0:
+                pipe.execute()
+                if progress:
+                    progress(compacted)
+        pipe.execute()
+        if progress:
+            progress(compacted)
+        self.invalidate_all_suggestions()
+        return compacted
+
+    def swap_in(self, shadow):
+        """
+        Atomically replace this recommender's data with the data of a
+            shadow recommender (another namespace), e.g after a rebuild.
+         * RENAME every shadow key over its live counterpart.
+         * UNLINK live keys that have no shadow counterpart.
+         Both happen in one MULTI/EXEC transaction, readers see either the
+            old or the new data.
+
+        :params shadow (Recommender): Recommender holding the new data.
+
+        :return (int): Number of keys swapped in.
+        """
+        prefix = shadow.namespace.encode("utf-8")
+        live_prefix = self.namespace.encode("utf-8")
+        stale_keys = set(
+            self.conn.scan_iter(match=self.get_product_key("*"), count=1000)
+        )
+        pipe = self.conn.pipeline(transaction=True)
+        swapped = 0
+        for key in shadow.conn.scan_iter(
+            match=shadow.get_product_key("*"), count=1000
+        ):
+            live_key = live_prefix + key[len(prefix):]
+            pipe.rename(key, live_key)
+            stale_keys.discard(live_key)
+            swapped += 1
+        if stale_keys:
+            pipe.unlink(*stale_keys)
+        # Decay anchors belong with the scores they were applied to
+        if shadow.conn.exists(shadow.get_anchors_key()):
+            pipe.rename(shadow.get_anchors_key(), self.get_anchors_key())
+        else:
+            pipe.unlink(self.get_anchors_key())
+        pipe.execute()
+        self.invalidate_all_suggestions()
+        return swapped
@@ -0,0 +1,125 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.postgres.search import (
+    SearchQuery, SearchRank, SearchVector, TrigramSimilarity,
+    TrigramWordSimilarity
+)
+from django.db import connections
+from django.db.models import F, Q
+
+from .catalog import get_catalog_cache, get_catalog_version
+from .models import ProductListing
+
+# Longer terms are cut, they only make queries slower.
+MAX_TERM_LENGTH = 100
+
+
+def normalize_term(term) -> str:
+    """ Collapse whitespace and cut the term at MAX_TERM_LENGTH. """
+    return " ".join(term.split())[:MAX_TERM_LENGTH].strip()
+
+
+def get_search_config(language) -> str:
+    """ PostgreSQL text search configuration of a language. """
+    return settings.SHOP_SEARCH_CONFIGS.get(language, "simple")
+
+
+def is_postgresql(queryset) -> bool:
+    return connections[queryset.db].vendor == "postgresql"
+
+
+def update_search_vectors(listings) -> None:
+    """
+    Compute the search vectors of listings, the name weighted over the
+        description, with the text search configuration of each language.
+        Does nothing outside PostgreSQL.
+
+    :params listings (QuerySet): ProductListing objects.
+    """
+    if not is_postgresql(listings):
+        return
+    for language, _ in settings.LANGUAGES:
+        config = get_search_config(language)
+        listings.filter(language_code=language).update(
+            search_vector=(
+                SearchVector("name", weight="A", config=config)
+                + SearchVector("description", weight="B", config=config)
+            )
+        )
+
+
+def search_listings(term, language):
+    """
+    Available listings of a language matching a search term, best first.
+    On PostgreSQL, listings match on their search vector, web search syntax
+        allowed, or on a trigram similar name to forgive typos. Both are
+        answered by the GIN indexes of ProductListing and ranked together.
+    Elsewhere, listings whose name or description contain the term are
+        returned by name.
+
+    :params term (str): Normalized search term, see normalize_term().
+    :params language (str): Language code.
+
+    :return (QuerySet): ProductListing objects
+    """
+    listings = ProductListing.objects.filter(
+        language_code=language, available=True
+    )
+    if not is_postgresql(listings):
+        return listings.filter(
+            Q(name__icontains=term) | Q(description__icontains=term)
+        ).order_by("name", "product_id")
+
+    query = SearchQuery(
+        term, config=get_search_config(language), search_type="websearch"
+    )
+    return listings.filter(
+        Q(search_vector=query) | Q(name__trigram_similar=term)
+    ).annotate(
+        rank=SearchRank(F("search_vector"), query)
+        + TrigramSimilarity("name", term)
+    ).order_by("-rank", "product_id")
+
+
+def suggest_listings(term, language, limit):
+    """
+    Available listings of a language whose name has a word starting like
+        the term, for autocompletion. Trigram word similarity on
+        PostgreSQL, case-insensitive containment elsewhere.
+
+    :return (QuerySet): At most limit ProductListing objects
+    """
+    listings = ProductListing.objects.filter(
+        language_code=language, available=True
+    ).only("product_id", "name", "slug")
+    if not is_postgresql(listings):
+        return listings.filter(name__icontains=term).order_by("name")[:limit]
+    return listings.filter(name__trigram_word_similar=term).annotate(
+        similarity=TrigramWordSimilarity(term, "name")
+    ).order_by("-similarity", "name")[:limit]
+
+
+def get_suggestions(term, language) -> list:
+    """
+    Autocomplete suggestions for a search term, cached in the catalog cache
+        until the catalog changes.
+
+    :return (list): {"name": str, "url": str} dicts
+    """
+    term = normalize_term(term).lower()
+    if len(term) < 2:
+        return []
+    digest = hashlib.sha1(term.encode("utf-8")).hexdigest()
+    cache_key = f"search:suggest:{get_catalog_version()}:{language}:{digest}"
+    cache = get_catalog_cache()
+    suggestions = cache.get(cache_key)
+    if suggestions is None:
+        suggestions = [
+            {"name": listing.name, "url": listing.get_absolute_url()}
+            for listing in suggest_listings(
+                term, language, settings.SHOP_SEARCH_SUGGESTIONS
+            )
+        ]
+        cache.set(cache_key, suggestions, settings.CATALOG_CACHE_TIMEOUT)
+    return suggestions
@@ -0,0 +1,64 @@
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import bump_catalog_version
+from .listings import refresh_listings
+from .models import Category, Product
+
+ProductTranslation = Product._parler_meta.root_model
+CategoryTranslation = Category._parler_meta.root_model
+
+
+# Translated fields are saved in their own models.
+@receiver([post_save, post_delete], sender=Category)
+@receiver([post_save, post_delete], sender=CategoryTranslation)
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductTranslation)
+def invalidate_catalog(sender, **kwargs):
+    """
+    Bump the catalog version when products or categories change, including
+        price and availability edits from the admin changelist. The bump
+        waits for the commit, otherwise a request could cache pages of the
+        old rows under the new version.
+    Queryset update() calls send no signals, call bump_catalog_version()
+        after them.
+    """
+    transaction.on_commit(bump_catalog_version)
+
+
+@receiver(post_save, sender=Product)
+def refresh_product_listings(sender, instance, **kwargs):
+    """
+    Keep product listings up to date, see ProductListing. Deleted products
+        and categories take their listings with them.
+    Queryset update() calls send no signals, call refresh_listings() after
+        them.
+    """
+    refresh_listings([instance.id])
+
+
+def is_cascade(sender, origin=None, **kwargs):
+    """ Whether a deletion is cascaded from another model's. """
+    if origin is None:
+        return False
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is not sender
+
+
+@receiver([post_save, post_delete], sender=ProductTranslation)
+def refresh_translation_listings(sender, instance, **kwargs):
+    if is_cascade(sender, **kwargs):
+        return
+    refresh_listings([instance.master_id])
+
+
+@receiver([post_save, post_delete], sender=CategoryTranslation)
+def refresh_category_listings(sender, instance, **kwargs):
+    if is_cascade(sender, **kwargs):
+        return
+    refresh_listings(
+        Product.objects.filter(category_id=instance.master_id)
+        .values_list("id", flat=True)
+    )
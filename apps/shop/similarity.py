@@ -0,0 +1,123 @@
+from array import array
+
+import numpy as np
+from django.conf import settings
+from scipy import sparse
+
+from apps.orders.models import OrderItem
+
+from .snapshot import Snapshot, SnapshotBackend
+
+METRICS = ("cosine", "jaccard", "lift")
+
+
+class SimilarityBackend(SnapshotBackend):
+    """
+    Recommender backend serving precomputed item-item similarities from the
+        index built by build_similarity_index(), at
+        RECOMMENDER_SIMILARITY_PATH.
+    """
+
+    def __init__(self, path=None):
+        super().__init__(path or settings.RECOMMENDER_SIMILARITY_PATH)
+
+
+def get_order_product_matrix(batch_size=10000):
+    """
+    Build the binary order-by-product matrix of paid orders from OrderItem.
+
+    :return (tuple): CSR matrix, product ID strings labelling its columns.
+    """
+    orders, products = {}, {}
+    rows, columns = [], []
+    items = OrderItem.objects.filter(order__paid=True).values_list(
+        "order_id", "product_id"
+    )
+    for order_id, product_id in items.iterator(chunk_size=batch_size):
+        rows.append(orders.setdefault(order_id, len(orders)))
+        columns.append(products.setdefault(product_id, len(products)))
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float64), (rows, columns)),
+        shape=(len(orders), len(products))
+    )
+    # Several lines of the same product count as one purchase
+    matrix.data[:] = 1
+    return matrix, [str(id) for id in products]
+
+
+def get_similarities(matrix, metric="cosine", min_count=1, batch_size=1024):
+    """
+    Compute item-item similarities from an order-by-product matrix.
+        Co-occurrence counts C = X'X are normalized in batches of product
+        rows, only over the non-zero entries:
+            * cosine - c_ij / sqrt(n_i * n_j)
+            * jaccard - c_ij / (n_i + n_j - c_ij)
+            * lift - c_ij * orders / (n_i * n_j)
+        where n_i is the number of orders with product i.
+
+    :params matrix (csr_matrix): Binary order-by-product matrix.
+    :params metric (str, optional): One of METRICS. Defaults to cosine.
+    :params min_count (int, optional): Ignore pairs bought together fewer
+        times. Defaults to 1.
+    :params batch_size (int, optional): Product rows per batch.
+
+    yield:(csr_matrix): Similarity rows of each batch, without the diagonal.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown similarity metric {metric!r}")
+    orders, n_products = matrix.shape
+    matrix_t = matrix.T.tocsr()
+    counts = np.asarray(matrix.sum(axis=0)).ravel()
+    for start in range(0, n_products, batch_size):
+        block = (matrix_t[start:start + batch_size] @ matrix).tocoo()
+        row = block.row + start
+        keep = (row != block.col) & (block.data >= min_count)
+        row, col, co = row[keep], block.col[keep], block.data[keep]
+        if metric == "cosine":
+            data = co / np.sqrt(counts[row] * counts[col])
+        elif metric == "jaccard":
+            data = co / (counts[row] + counts[col] - co)
+        else:
+            data = co * orders / (counts[row] * counts[col])
+        yield sparse.csr_matrix(
+            (data, (row - start, col)),
+            shape=(block.shape[0], n_products)
+        )
+
+
+def build_similarity_index(path=None, metric="cosine", top_k=None,
+                           min_count=1, batch_size=1024):
+    """
+    Precompute the top_k most similar products of every product from paid
+        orders and write them to a snapshot file for SimilarityBackend.
+
+    :params path (str, optional): Defaults to RECOMMENDER_SIMILARITY_PATH.
+    :params metric (str, optional): One of METRICS. Defaults to cosine.
+    :params top_k (int, optional): Neighbours kept per product.
+        Defaults to RECOMMENDER_SNAPSHOT_MAX_RELATED.
+    :params min_count (int, optional): See get_similarities().
+    :params batch_size (int, optional): See get_similarities().
+
+    :return (Snapshot): The index written.
+    """
+    path = path or settings.RECOMMENDER_SIMILARITY_PATH
+    if top_k is None:
+        top_k = settings.RECOMMENDER_SNAPSHOT_MAX_RELATED
+    matrix, product_ids = get_order_product_matrix()
+
+    indptr, indices, scores = array("q", [0]), array("q"), array("d")
+    for block in get_similarities(matrix, metric, min_count, batch_size):
+        for i in range(block.shape[0]):
+            start, end = block.indptr[i], block.indptr[i + 1]
+            columns, data = block.indices[start:end], block.data[start:end]
+            if len(data) > top_k:
+                best = np.argpartition(-data, top_k)[:top_k]
+                columns, data = columns[best], data[best]
+            order = np.argsort(-data, kind="stable")
+            indices.frombytes(columns[order].astype(np.int64).tobytes())
+            scores.frombytes(data[order].astype(np.float64).tobytes())
+            indptr.append(len(indices))
+
+    snapshot = Snapshot(product_ids, indptr, indices, scores)
+    snapshot.save(path)
+    return snapshot
@@ -0,0 +1,287 @@
+import heapq
+import json
+import logging
+import math
+import os
+import struct
+import threading
+import time
+from array import array
+from collections import defaultdict
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_VERSION = 1
+_HEADER_SIZE = struct.Struct("!I")
+
+
+class Snapshot:
+    """
+    Read-only, in-process copy of the co-purchase data, kept as a sparse
+        matrix in CSR form:
+            * product_ids - Product ID strings, row/column labels.
+            * indptr - Row i spans indices/scores[indptr[i]:indptr[i + 1]].
+            * indices - Column (related product) of each entry.
+            * scores - Score of each entry, highest first within a row.
+    """
+
+    def __init__(self, product_ids, indptr, indices, scores):
+        self.product_ids = product_ids
+        self.positions = {id: index for index, id in enumerate(product_ids)}
+        self.indptr = indptr
+        self.indices = indices
+        self.scores = scores
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build a snapshot from (product_id, [(with_id, score), ...]) rows.
+        """
+        product_ids = []
+        positions = {}
+
+        def position(id):
+            if id not in positions:
+                positions[id] = len(product_ids)
+                product_ids.append(id)
+            return positions[id]
+
+        related = defaultdict(list)
+        for product_id, suggestions in rows:
+            row = position(product_id)
+            related[row] = sorted(
+                ((position(id), score) for id, score in suggestions),
+                key=lambda x: -x[1]
+            )
+
+        indptr, indices, scores = array("q", [0]), array("q"), array("d")
+        for row in range(len(product_ids)):
+            for column, score in related.get(row, []):
+                indices.append(column)
+                scores.append(score)
+            indptr.append(len(indices))
+        return cls(product_ids, indptr, indices, scores)
+
+    def save(self, path):
+        """
+        Write the snapshot to path, atomically replacing any previous one.
+            Layout: header length, JSON header, then the raw arrays.
+        """
+        header = json.dumps({
+            "version": SNAPSHOT_VERSION,
+            "product_ids": self.product_ids,
+            "entries": len(self.indices),
+        }).encode("utf-8")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(_HEADER_SIZE.pack(len(header)))
+            f.write(header)
+            self.indptr.tofile(f)
+            self.indices.tofile(f)
+            self.scores.tofile(f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as f:
+            (size,) = _HEADER_SIZE.unpack(f.read(_HEADER_SIZE.size))
+            header = json.loads(f.read(size))
+            if header["version"] != SNAPSHOT_VERSION:
+                raise ValueError(
+                    f"Unsupported snapshot version {header['version']}"
+                )
+            indptr, indices, scores = array("q"), array("q"), array("d")
+            indptr.fromfile(f, len(header["product_ids"]) + 1)
+            indices.fromfile(f, header["entries"])
+            scores.fromfile(f, header["entries"])
+        return cls(header["product_ids"], indptr, indices, scores)
+
+    def get_row(self, product_id):
+        """
+        Related products of a product as (column, score) pairs.
+        """
+        row = self.positions.get(product_id)
+        if row is None:
+            return []
+        start, end = self.indptr[row], self.indptr[row + 1]
+        return zip(self.indices[start:end], self.scores[start:end])
+
+    def get_scored_suggestions(self, product_ids: list, max_results=6,
+                               min_score=None):
+        """
+        Same contract as Recommender.get_scored_suggestions().
+        """
+        if max_results <= 0:
+            return []
+        if len(product_ids) == 1:
+            suggestions = []
+            for column, score in self.get_row(product_ids[0]):
+                if len(suggestions) == max_results or (
+                    min_score is not None and score < min_score
+                ):
+                    break
+                suggestions.append((self.product_ids[column], score))
+            return suggestions
+
+        totals = defaultdict(float)
+        for product_id in product_ids:
+            for column, score in self.get_row(product_id):
+                totals[column] += score
+        excluded = {self.positions.get(id) for id in product_ids}
+        best = heapq.nlargest(
+            max_results,
+            (
+                (score, column) for column, score in totals.items()
+                if column not in excluded
+                and (min_score is None or score >= min_score)
+            )
+        )
+        return [(self.product_ids[column], score) for score, column in best]
+
+
+class SnapshotBackend:
+    """
+    Recommender backend serving suggestions from the snapshot file at
+        RECOMMENDER_SNAPSHOT_PATH, entirely in-process. The file is loaded
+        on a background thread, started when the app is ready, and reloaded
+        when it changes, checked every RECOMMENDER_SNAPSHOT_CHECK_INTERVAL
+        seconds at most. Requests never wait for the file: until a snapshot
+        is loaded, or without one, there are no suggestions.
+    """
+    _snapshots = {}
+    _loading = set()
+    _loading_pid = None
+    _lock = threading.Lock()
+
+    def __init__(self, path=None):
+        self.path = str(path or settings.RECOMMENDER_SNAPSHOT_PATH)
+
+    def get_snapshot(self):
+        """ The loaded snapshot, if any, scheduling a reload when due. """
+        checked_at, _, snapshot = self._snapshots.get(
+            self.path, (None, None, None)
+        )
+        if checked_at is None or (
+            time.monotonic() - checked_at
+            >= settings.RECOMMENDER_SNAPSHOT_CHECK_INTERVAL
+        ):
+            self.preload()
+        return snapshot
+
+    def preload(self):
+        """
+        Start (re)loading the snapshot on a background thread, unless one
+            is already running for this path in this process.
+
+        :return (threading.Thread): The thread started, None otherwise.
+        """
+        cls = type(self)
+        with self._lock:
+            if cls._loading_pid != os.getpid():
+                # Threads don't survive a fork, their paths are not loading.
+                cls._loading = set()
+                cls._loading_pid = os.getpid()
+            if self.path in self._loading:
+                return None
+            self._loading.add(self.path)
+        thread = threading.Thread(
+            target=self.load, name="recommender-snapshot", daemon=True
+        )
+        thread.start()
+        return thread
+
+    def load(self):
+        """ Load the snapshot file if it changed since the last load. """
+        _, mtime, snapshot = self._snapshots.get(self.path, (None, None, None))
+        try:
+            try:
+                current_mtime = os.stat(self.path).st_mtime
+                if current_mtime != mtime:
+                    snapshot = Snapshot.load(self.path)
+            except FileNotFoundError:
+                current_mtime, snapshot = None, None
+            except Exception:
+                # Keep serving the previous snapshot, retry at the next check
+                current_mtime = mtime
+                logger.exception("Could not load snapshot %s", self.path)
+            self._snapshots[self.path] = (
+                time.monotonic(), current_mtime, snapshot
+            )
+        finally:
+            with self._lock:
+                self._loading.discard(self.path)
+
+    def get_scored_suggestions(self, product_ids: list, max_results=6,
+                               min_score=None):
+        snapshot = self.get_snapshot()
+        if snapshot is None:
+            return []
+        return snapshot.get_scored_suggestions(
+            product_ids, max_results, min_score
+        )
+
+    def get_scored_suggestions_many(self, product_ids: list, max_results=6,
+                                    min_score=None):
+        return {
+            id: self.get_scored_suggestions([id], max_results, min_score)
+            for id in product_ids
+        }
+
+
+def build_snapshot(recommender, path=None, max_related=None, batch_size=500):
+    """
+    Dump the top related products of every product from Redis to a
+        snapshot file for SnapshotBackend. Scores are decayed to now when
+        time-decay is on.
+
+    :params recommender (Recommender): Recommender to read from.
+    :params path (str, optional): Defaults to RECOMMENDER_SNAPSHOT_PATH.
+    :params max_related (int, optional): Related products kept per product.
+        Defaults to RECOMMENDER_SNAPSHOT_MAX_RELATED.
+    :params batch_size (int, optional): Keys read per pipeline.
+
+    :return (Snapshot): The snapshot written.
+    """
+    path = path or settings.RECOMMENDER_SNAPSHOT_PATH
+    if max_related is None:
+        max_related = settings.RECOMMENDER_SNAPSHOT_MAX_RELATED
+    now = time.time()
+    rate = recommender.get_decay_rate()
+    anchors = {
+        id.decode("utf-8"): float(anchor) for id, anchor in
+        recommender.conn.hgetall(recommender.get_anchors_key()).items()
+    }
+    # product:<id>:purchased_with -> <id>
+    start = len(recommender.namespace) + 1
+    end = -len(":purchased_with")
+
+    def read_batch(keys):
+        pipe = recommender.conn.pipeline(transaction=False)
+        for key in keys:
+            pipe.zrange(key, 0, max_related - 1, desc=True, withscores=True)
+        for key, suggestions in zip(keys, pipe.execute()):
+            product_id = key.decode("utf-8")[start:end]
+            factor = math.exp(-rate * (now - anchors.get(product_id, now)))
+            yield product_id, [
+                (id.decode("utf-8"), score * factor)
+                for id, score in suggestions
+            ]
+
+    def read_rows():
+        keys = []
+        for key in recommender.conn.scan_iter(
+            match=recommender.get_product_key("*"), count=batch_size
+        ):
+            keys.append(key)
+            if len(keys) >= batch_size:
+                yield from read_batch(keys)
+                keys = []
+        if keys:
+            yield from read_batch(keys)
+
+    snapshot = Snapshot.from_rows(read_rows())
+    snapshot.save(path)
+    return snapshot
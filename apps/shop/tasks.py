@@ -0,0 +1,58 @@
+import logging
+
+from celery import shared_task
+
+from .recommender import Recommender
+from .snapshot import build_snapshot as build_recommender_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+@shared_task
+def clear_purchases(batch_size=1000):
+    """
+    Task to delete all product co-purchase data used for recommendations.
+    """
+    def progress(deleted):
+        logger.info("Cleared %s recommendation keys", deleted)
+
+    return Recommender().clear_purchases(
+        batch_size=batch_size, progress=progress
+    )
+
+
+@shared_task
+def compact_purchases(batch_size=500):
+    """
+    Task to rescale time-decayed co-purchase scores and trim each product's
+        related products to RECOMMENDER_MAX_RELATED. Scheduled with
+        CELERY_BEAT_SCHEDULE.
+    """
+    def progress(compacted):
+        logger.info("Compacted %s recommendation keys", compacted)
+
+    return Recommender().compact_purchases(
+        batch_size=batch_size, progress=progress
+    )
+
+
+@shared_task
+def build_snapshot():
+    """
+    Task to refresh the in-process recommendations snapshot used when Redis
+        is unavailable. Scheduled with CELERY_BEAT_SCHEDULE.
+    """
+    snapshot = build_recommender_snapshot(Recommender())
+    return len(snapshot.product_ids)
+
+
+@shared_task
+def build_similarity_index(metric="cosine"):
+    """
+    Task to precompute the item-item similarity index served by
+        apps.shop.similarity.SimilarityBackend.
+    """
+    from .similarity import build_similarity_index as build_index
+
+    snapshot = build_index(metric=metric)
+    return len(snapshot.product_ids)
@@ -5,6 +5,11 @@ app_name = "shop"
 
 urlpatterns = [
     path("", views.product_list, name="product_list"),
+    path("search/", views.product_search, name="product_search"),
+    path(
+        "search/suggest/", views.product_search_suggest,
+        name="product_search_suggest"
+    ),
     path("<slug:category_slug>/", views.product_list, name="product_cat_list"),
     path("<uuid:id>/<slug:slug>/", views.product_detail, name="product_detail")
 ]
@@ -1,39 +1,103 @@
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Prefetch
+from django.http import JsonResponse
 from django.shortcuts import render, get_object_or_404
-from .models import Category, Product
+from django.utils.functional import SimpleLazyObject
+from parler.utils.i18n import get_active_language_choices
+
+from .catalog import get_catalog_cache, get_catalog_version
+from .models import Category, ProductListing
+from .pagination import paginate_keyset
 from .recommender import Recommender
+from .search import get_suggestions, normalize_term, search_listings
 from apps.cart.forms import CartAddProductForm
 
 
+def prefetch_translations(model, language):
+    """
+    Prefetch only the translations parler may read: the language and its
+        fallbacks.
+    """
+    return Prefetch(
+        "translations",
+        queryset=model._parler_meta.root_model.objects.filter(
+            language_code__in=get_active_language_choices(language)
+        )
+    )
+
+
 def product_list(request, category_slug=None):
     # Fetch all products
+    language = request.LANGUAGE_CODE
     category = None
-    categories = Category.objects.all()
-    products = Product.objects.filter(available=True)
+    categories = Category.objects.prefetch_related(
+        prefetch_translations(Category, language)
+    )
+    products = ProductListing.objects.filter(
+        language_code=language, available=True
+    ).only("product_id", "created", "name", "slug", "image", "price")
 
     # Fetch products per category
     if category_slug:
-        language = request.LANGUAGE_CODE
         category = get_object_or_404(
             Category, translations__language_code=language,
             translations__slug=category_slug
         )
         products = products.filter(category=category)
 
+    # Only read when the page fragment isn't cached.
+    page = SimpleLazyObject(lambda: paginate_keyset(
+        products, settings.SHOP_PAGE_SIZE,
+        after=request.GET.get("after"), before=request.GET.get("before"),
+        key="product_id"
+    ))
+
     context = {
         "category": category,
         "categories": categories,
-        "products": products
+        "page": page
     }
     return render(request, "shop/product/list.html", context)
 
 
+def product_search(request):
+    query = normalize_term(request.GET.get("q", ""))
+    page = None
+    if query:
+        products = search_listings(query, request.LANGUAGE_CODE).only(
+            "product_id", "name", "slug", "image", "price"
+        )
+        page = Paginator(products, settings.SHOP_PAGE_SIZE).get_page(
+            request.GET.get("page")
+        )
+
+    context = {
+        "query": query,
+        "page": page
+    }
+    return render(request, "shop/product/search.html", context)
+
+
+def product_search_suggest(request):
+    suggestions = get_suggestions(
+        request.GET.get("q", ""), request.LANGUAGE_CODE
+    )
+    return JsonResponse({"suggestions": suggestions})
+
+
 def product_detail(request, id, slug):
     language = request.LANGUAGE_CODE
-    product = get_object_or_404(
-        Product, id=id, translations__slug=slug,
-        translations__language_code=language,
-        available=True
-    )
+    # Listings are served from the catalog cache until the catalog changes.
+    cache = get_catalog_cache()
+    cache_key = f"product_detail:{get_catalog_version()}:{language}:{id}:{slug}"
+    product = cache.get(cache_key)
+    if product is None:
+        product = get_object_or_404(
+            ProductListing.objects.defer("search_vector"), product_id=id,
+            language_code=language, slug=slug, available=True
+        )
+        cache.set(cache_key, product, settings.CATALOG_CACHE_TIMEOUT)
     cart_product_form = CartAddProductForm()
     r = Recommender()
     recommended_products = r.suggest_products_for([product], 4)
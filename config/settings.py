@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 
+from celery.schedules import crontab
 from decouple import config
 from django.utils.translation import gettext_lazy as _
 
@@ -39,6 +40,7 @@ INSTALLED_APPS = [
     "django.contrib.sessions",
     "django.contrib.messages",
     "django.contrib.staticfiles",
+    "django.contrib.postgres",
 
     # Extras
     "corsheaders",
@@ -84,6 +86,7 @@ TEMPLATES = [
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
                 "apps.cart.context_processors.cart",
+                "apps.shop.context_processors.catalog",
             ],
         },
     },
@@ -111,6 +114,72 @@ DATABASES = {
 }
 
 
+# Redis Config
+REDIS_HOST = config("REDIS_HOST", default="redis")
+REDIS_PORT = config("REDIS_PORT", default="6379")
+REDIS_DB = config("REDIS_DB", default="1")
+REDIS_USER = config("REDIS_USER", default=" ")
+REDIS_PASSWORD = config("REDIS_PASSWORD", default=" ")
+
+# Shared connection pools, see apps/common/redis_pool.py. Caches draw from
+#   them too, see apps/common/cache.py.
+REDIS_MAX_CONNECTIONS = config("REDIS_MAX_CONNECTIONS", default=50, cast=int)
+REDIS_POOL_TIMEOUT = config("REDIS_POOL_TIMEOUT", default=5, cast=float)
+REDIS_SOCKET_TIMEOUT = config("REDIS_SOCKET_TIMEOUT", default=2, cast=float)
+REDIS_SOCKET_CONNECT_TIMEOUT = config(
+    "REDIS_SOCKET_CONNECT_TIMEOUT", default=2, cast=float
+)
+REDIS_HEALTH_CHECK_INTERVAL = config(
+    "REDIS_HEALTH_CHECK_INTERVAL", default=30, cast=int
+)
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# Caches invalidated from other processes, e.g Celery workers, must be
+#   shared by all of them. They live on a Redis server of their own, run with
+#   a maxmemory limit and the allkeys-lru policy (see docker-compose.yml), so
+#   entries are evicted instead of piling up and flushing them never touches
+#   the data kept in REDIS_DB.
+REDIS_CACHE_LOCATION = config(
+    "REDIS_CACHE_LOCATION", default="redis://redis-cache:6379/0"
+)
+# Caches skip Redis for a while after consecutive failures, serving misses,
+#   see apps/common/cache.py.
+REDIS_CACHE_BREAKER_THRESHOLD = config(
+    "REDIS_CACHE_BREAKER_THRESHOLD", default=5, cast=int
+)
+REDIS_CACHE_BREAKER_RESET_TIMEOUT = config(
+    "REDIS_CACHE_BREAKER_RESET_TIMEOUT", default=30, cast=float
+)
+# Latency budget (seconds) of cache calls, pages serve a miss past it.
+REDIS_CACHE_BUDGET = config("REDIS_CACHE_BUDGET", default=0.05, cast=float)
+REDIS_CACHE = {
+    "BACKEND": "apps.common.cache.RedisCache",
+    "LOCATION": REDIS_CACHE_LOCATION,
+    "OPTIONS": {"BUDGET": REDIS_CACHE_BUDGET},
+}
+
+CACHES = {
+    "default": {
+        **REDIS_CACHE,
+        "KEY_PREFIX": "default",
+    },
+    "recommendations": {
+        **REDIS_CACHE,
+        "KEY_PREFIX": "recommendations",
+        "TIMEOUT": config("RECOMMENDER_CACHE_TIMEOUT", default=300, cast=int),
+    },
+    # Catalog page fragments, see apps/shop/catalog.py. Shared, so catalog
+    #   edits reach every process.
+    "catalog": {
+        **REDIS_CACHE,
+        "KEY_PREFIX": "catalog",
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -171,8 +240,43 @@ STATIC_ROOT = BASE_DIR / "apps/common/static"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Products per catalog page.
+SHOP_PAGE_SIZE = config("SHOP_PAGE_SIZE", default=24, cast=int)
+# Cached catalog fragments, invalidated by catalog edits anyway.
+CATALOG_CACHE_ALIAS = "catalog"
+CATALOG_CACHE_TIMEOUT = config(
+    "CATALOG_CACHE_TIMEOUT", default=86400, cast=int
+)
+# Product search. PostgreSQL text search configuration per language, other
+#   languages use "simple". Search vectors are rebuilt by
+#   rebuild_product_listings.
+SHOP_SEARCH_CONFIGS = {
+    "en": "english",
+    "es": "spanish",
+}
+# Autocomplete suggestions per search term.
+SHOP_SEARCH_SUGGESTIONS = config(
+    "SHOP_SEARCH_SUGGESTIONS", default=8, cast=int
+)
+
 # Cart Functionality
 CART_SESSION_ID = "cart"
+# Where carts are kept, "apps.cart.storage.RedisCartStorage" to take cart
+#   writes off the session table. Redis carts expire after CART_REDIS_TTL
+#   seconds without changes.
+CART_STORAGE = config(
+    "CART_STORAGE", default="apps.cart.storage.SessionCartStorage"
+)
+CART_REDIS_TTL = config("CART_REDIS_TTL", default=1209600, cast=int)
+# Seconds coupons applied to carts are cached, edits invalidate them.
+COUPON_CACHE_TIMEOUT = config("COUPON_CACHE_TIMEOUT", default=300, cast=int)
+
+# Order numbers, see apps/orders/utils.py. Numbers are unique for a given
+#   length, 32 ** ORDER_NO_LENGTH of them (at most 12). Orders placed before
+#   have random 5 character numbers.
+ORDER_NO_LENGTH = config("ORDER_NO_LENGTH", default=6, cast=int)
+# Sequence values reserved at a time by each process.
+ORDER_NO_BLOCK_SIZE = config("ORDER_NO_BLOCK_SIZE", default=20, cast=int)
 
 # Email Config
 EMAIL_HOST = config('EMAIL_HOST', default='')
@@ -208,10 +312,73 @@ STATICFILES_STORAGE = config("DEFAULT_FILE_STORAGE", default=" ")
 # Celery Config
 CELERY_BROKER_URL = config("CELERY_BROKER", default="redis://redis:6379/0")
 CELERY_RESULT_BACKEND = config("CELERY_BACKEND", default="redis://redis:6379/0")
+# Sent by the beat process, the celery-beat service of docker-compose.yml
+#   and the beat entry of the Procfile. Run a single one, every beat
+#   process sends each task.
+CELERY_BEAT_SCHEDULE = {
+    "compact-recommendations": {
+        "task": "apps.shop.tasks.compact_purchases",
+        "schedule": crontab(hour=3, minute=0),
+    },
+    "build-recommender-snapshot": {
+        "task": "apps.shop.tasks.build_snapshot",
+        "schedule": crontab(minute="*/15"),
+    },
+}
 
-# Redis Config
-REDIS_HOST = config("REDIS_HOST", default="redis")
-REDIS_PORT = config("REDIS_PORT", default="6379")
-REDIS_DB = config("REDIS_DB", default="1")
-REDIS_USER = config("REDIS_USER", default=" ")
-REDIS_PASSWORD = config("REDIS_PASSWORD", default=" ")
+# Recommender Config
+# Extra suggestions read to replace products that fail to hydrate.
+RECOMMENDER_OVERFETCH = config("RECOMMENDER_OVERFETCH", default=4, cast=int)
+# Hydrated suggestions cache, shared with the Celery workers recording
+#   purchases so their invalidations reach the web processes.
+RECOMMENDER_CACHE_ALIAS = "recommendations"
+# Seconds orders recorded by the record_order_purchases task stay marked,
+#   so the task's retries don't count them twice.
+RECOMMENDER_ORDER_MARKER_TTL = config(
+    "RECOMMENDER_ORDER_MARKER_TTL", default=86400, cast=int
+)
+# Co-purchase weights halve every given number of days, 0 to disable.
+RECOMMENDER_DECAY_HALF_LIFE = config(
+    "RECOMMENDER_DECAY_HALF_LIFE", default=0, cast=float
+)
+# Compaction drops pairs decayed below this score ...
+RECOMMENDER_DECAY_MIN_SCORE = config(
+    "RECOMMENDER_DECAY_MIN_SCORE", default=0.01, cast=float
+)
+# ... and keeps at most this many related products per product, 0 for all.
+RECOMMENDER_MAX_RELATED = config(
+    "RECOMMENDER_MAX_RELATED", default=200, cast=int
+)
+# Latency budget (seconds) of suggestion reads from Redis. Failing reads are
+#   answered by the fallback backend and, after RECOMMENDER_BREAKER_THRESHOLD
+#   consecutive failures, Redis is skipped for RECOMMENDER_BREAKER_RESET_TIMEOUT
+#   seconds.
+RECOMMENDER_TIMEOUT = config("RECOMMENDER_TIMEOUT", default=0.025, cast=float)
+# Cached suggestions are read with the same budget
+CACHES["recommendations"]["OPTIONS"] = {"BUDGET": RECOMMENDER_TIMEOUT}
+RECOMMENDER_BREAKER_THRESHOLD = config(
+    "RECOMMENDER_BREAKER_THRESHOLD", default=5, cast=int
+)
+RECOMMENDER_BREAKER_RESET_TIMEOUT = config(
+    "RECOMMENDER_BREAKER_RESET_TIMEOUT", default=30, cast=float
+)
+RECOMMENDER_FALLBACK_BACKEND = "apps.shop.snapshot.SnapshotBackend"
+# Serve suggestions from this backend instead of Redis, e.g
+#   "apps.shop.similarity.SimilarityBackend" with an index built by the
+#   build_similarity_index command. Empty to use Redis.
+RECOMMENDER_BACKEND = config("RECOMMENDER_BACKEND", default="")
+RECOMMENDER_SIMILARITY_PATH = config(
+    "RECOMMENDER_SIMILARITY_PATH",
+    default=str(BASE_DIR / "var/similarity.snap")
+)
+# In-process snapshot used by the fallback backend, refreshed by the
+#   apps.shop.tasks.build_snapshot task.
+RECOMMENDER_SNAPSHOT_PATH = config(
+    "RECOMMENDER_SNAPSHOT_PATH", default=str(BASE_DIR / "var/recommender.snap")
+)
+RECOMMENDER_SNAPSHOT_MAX_RELATED = config(
+    "RECOMMENDER_SNAPSHOT_MAX_RELATED", default=50, cast=int
+)
+RECOMMENDER_SNAPSHOT_CHECK_INTERVAL = config(
+    "RECOMMENDER_SNAPSHOT_CHECK_INTERVAL", default=60, cast=float
+)
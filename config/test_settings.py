@@ -9,3 +9,17 @@ DATABASES = {
         "NAME": BASE_DIR / "db.sqlite3",    # noqa
     },
 }
+
+# No Redis in tests, per-process caches behave the same there.
+CACHES = {
+    alias: {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": alias,
+    }
+    for alias in CACHES    # noqa
+}
+
+# Deployments configure storages through the environment, templates using
+# {% static %} need real ones in tests.
+DEFAULT_FILE_STORAGE = "django.core.files.storage.FileSystemStorage"
+STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
@@ -0,0 +1,16 @@
+from .test_settings import * # noqa
+
+from decouple import config
+
+# The test suite on PostgreSQL, for the search and row locking code paths
+# skipped on SQLite. Used by the postgres CI job.
+DATABASES = {
+    "default": {
+        "ENGINE": "django.db.backends.postgresql",
+        "NAME": config("DB_NAME", default="wheel_deal"),
+        "USER": config("DB_USER", default="postgres"),
+        "PASSWORD": config("DB_PASSWORD", default="postgres"),
+        "HOST": config("DB_HOST", default="localhost"),
+        "PORT": config("DB_PORT", default="5432"),
+    },
+}
@@ -5,6 +5,7 @@ from django.contrib import admin
 from django.urls import include, path
 from django.utils.translation import gettext_lazy as _
 
+from apps.common import views as common_views
 from apps.payments import webhooks
 
 urlpatterns = i18n_patterns(
@@ -19,6 +20,10 @@ urlpatterns = i18n_patterns(
 
 urlpatterns += [
     path("webhook/", webhooks.stripe_webhook, name="stripe-webhook"),
+    path(
+        "health/redis/", common_views.redis_pool_stats,
+        name="redis-pool-stats"
+    ),
 ]
 
 if settings.DEBUG:
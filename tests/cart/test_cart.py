@@ -1,11 +1,13 @@
 # Generated by CodiumAI
 from decimal import Decimal
 
+from django.core.cache import cache
 from django.test import Client, TestCase
 from model_bakery import baker
 
 from apps.cart.cart import Cart
-from apps.shop.models import Product
+from apps.coupons.models import Coupon
+from apps.shop.models import Product, ProductListing
 
 
 class CartTestCase(TestCase):
@@ -78,8 +80,8 @@ class CartTestCase(TestCase):
         assert cart.get_total_price() == Decimal(10 * 2 + 15 * 3)
 
     def test_cart_iteration(self):
-        product1 = baker.make(Product, price=Decimal(10))
-        product2 = baker.make(Product, price=Decimal(15))
+        product1 = baker.make(Product, name="Product 1", price=Decimal(10))
+        product2 = baker.make(Product, name="Product 2", price=Decimal(15))
 
         cart = Cart(self.request)
 
@@ -89,7 +91,7 @@ class CartTestCase(TestCase):
 
         # Iterate over the cart and assert the product information
         for item in cart:
-            assert item["product"] in [product1, product2]
+            assert item["product"].id in [product1.id, product2.id]
             assert item["price"] == item["product"].price
             assert (
                 item["total_price"] == item["product"].price * item["quantity"]
@@ -109,3 +111,89 @@ class CartTestCase(TestCase):
         assert cart.cart["097d4168-4374-11ee-be56-0242ac120002"]["price"] == "15.00"    # noqa
         assert cart.get_total_price() == Decimal("15.00")
         assert product.price == Decimal("20.00")
+
+    def test_cart_iteration_is_memoized(self):
+        product1 = baker.make(Product, name="Product 1", price=Decimal(10))
+        product2 = baker.make(Product, name="Product 2", price=Decimal(15))
+
+        cart = Cart(self.request)
+        cart.add(product1, quantity=2)
+
+        # One query for the listings of the products
+        with self.assertNumQueries(1):
+            for _ in range(3):
+                assert [item["product"].id for item in cart] == [product1.id]
+                assert [item["product"].name for item in cart] == [
+                    "Product 1"
+                ]
+
+        # Changing the cart hydrates it again
+        cart.add(product2)
+        with self.assertNumQueries(1):
+            assert [item["product"].id for item in cart] == [
+                product1.id, product2.id
+            ]
+            list(cart)
+
+        cart.remove(product1)
+        assert [item["product"].id for item in cart] == [product2.id]
+
+    def test_cart_iteration_leaves_session_data_alone(self):
+        product = baker.make(Product, name="Product", price=Decimal(10))
+
+        cart = Cart(self.request)
+        cart.add(product)
+        list(cart)
+
+        assert cart.cart[str(product.id)] == {"quantity": 1, "price": "10.00"}
+
+    def test_cart_removes_unlisted_products(self):
+        product1 = baker.make(Product, name="Product 1", price=Decimal(10))
+        product2 = baker.make(Product, name="Product 2", price=Decimal(15))
+
+        cart = Cart(self.request)
+        cart.add(product1, quantity=2)
+        cart.add(product2)
+        assert cart.get_total_price() == Decimal(35)
+        ProductListing.objects.filter(product=product2).delete()
+
+        assert [item["product"].id for item in cart] == [product1.id]
+        assert cart.removed == [str(product2.id)]
+        assert len(cart) == 2
+        assert cart.get_total_price() == Decimal(20)
+        assert list(Cart(self.request).cart) == [str(product1.id)]
+
+    def test_cart_totals_with_coupon(self):
+        cache.clear()
+        product = baker.make(Product, price=Decimal(10))
+        coupon = baker.make(Coupon, discount=10)
+        self.request.session["coupon_id"] = str(coupon.id)
+
+        cart = Cart(self.request)
+        cart.add(product, quantity=3)
+
+        # The coupon is read once, totals are computed once
+        with self.assertNumQueries(1):
+            totals = cart.get_totals()
+            assert cart.coupon == coupon
+            assert cart.get_discount() == Decimal(3)
+            assert cart.get_total_price_after_discount() == Decimal(27)
+        assert totals == (Decimal(30), coupon, Decimal(3), Decimal(27))
+        assert cart.get_totals() is totals
+
+        # Other requests reuse the cached coupon ...
+        with self.assertNumQueries(0):
+            assert Cart(self.request).coupon == coupon
+
+        # ... until the edit is committed, so a concurrent read can't cache
+        # the old coupon again.
+        with self.captureOnCommitCallbacks(execute=True):
+            coupon.discount = 50
+            coupon.save()
+            assert Cart(self.request).get_discount() == Decimal(3)
+        assert Cart(self.request).get_discount() == Decimal(15)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            coupon.delete()
+        assert Cart(self.request).coupon is None
+        assert Cart(self.request).get_total_price_after_discount() == 30
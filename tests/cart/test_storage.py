@@ -0,0 +1,135 @@
+import base64
+from unittest.mock import Mock, patch
+
+from django.contrib.sessions.backends.db import SessionStore
+from django.test import RequestFactory, TestCase, override_settings
+
+from apps.cart.encoding import decode_cart, encode_cart
+from apps.cart.storage import RedisCartStorage, SessionCartStorage
+
+PRODUCT_A = "097d4168-4374-11ee-be56-0242ac120002"
+PRODUCT_B = "4a2663f3-c227-47e7-bffe-c68a177e7e38"
+
+
+class SessionCartStorageTestCase(TestCase):
+
+    def setUp(self):
+        self.request = RequestFactory().get("/")
+        self.request.session = SessionStore()
+        self.storage = SessionCartStorage(self.request)
+
+    def test_add(self):
+        self.storage.add(PRODUCT_A, 2, "10")
+        item = self.storage.add(PRODUCT_A, 1, "12.00")
+
+        assert item == {"quantity": 3, "price": "10.00"}
+        assert decode_cart(self.request.session["cart"]) == {PRODUCT_A: item}
+        assert self.request.session.modified
+
+        item = self.storage.add(PRODUCT_A, 1, "12.00", override_quantity=True)
+        assert item == {"quantity": 1, "price": "10.00"}
+
+    def test_remove_and_clear(self):
+        self.storage.add(PRODUCT_A, 1, "10.00")
+        self.storage.add(PRODUCT_B, 1, "10.00")
+
+        self.storage.remove(PRODUCT_A)
+        assert SessionCartStorage(self.request).load() == {
+            PRODUCT_B: {"quantity": 1, "price": "10.00"}
+        }
+
+        self.storage.clear()
+        assert SessionCartStorage(self.request).load() == {}
+
+    def test_load_without_cart_leaves_session_alone(self):
+        assert self.storage.load() == {}
+        assert not self.request.session.modified
+
+    def test_load_migrates_original_format(self):
+        cart = {
+            PRODUCT_A: {"quantity": 2, "price": "15.00"},
+            PRODUCT_B: {"quantity": 1, "price": "0.5"},
+        }
+        self.request.session["cart"] = cart
+
+        assert self.storage.load() == {
+            PRODUCT_A: {"quantity": 2, "price": "15.00"},
+            PRODUCT_B: {"quantity": 1, "price": "0.50"},
+        }
+        assert self.request.session["cart"] == encode_cart(cart)
+
+    def test_load_drops_undecodable_cart(self):
+        self.request.session["cart"] = [99, "payload"]
+
+        with self.assertLogs("apps.cart.storage", "WARNING"):
+            assert self.storage.load() == {}
+
+        self.storage.add(PRODUCT_A, 1, "10.00")
+        assert decode_cart(self.request.session["cart"]) == {
+            PRODUCT_A: {"quantity": 1, "price": "10.00"},
+        }
+
+    def test_encoding(self):
+        cart = {
+            PRODUCT_A: {"quantity": 20, "price": "123456.78"},
+            PRODUCT_B: {"quantity": 1, "price": "0.01"},
+        }
+        version, payload = encode_cart(cart)
+
+        assert version == 2
+        # 28 bytes per line item
+        assert len(base64.b64decode(payload)) == 56
+        assert decode_cart([version, payload]) == cart
+        assert decode_cart([2, ""]) == {}
+        with self.assertRaises(ValueError):
+            decode_cart([3, payload])
+
+
+@override_settings(CART_REDIS_TTL=60)
+class RedisCartStorageTestCase(TestCase):
+
+    def setUp(self):
+        self.request = RequestFactory().get("/")
+        self.request.session = SessionStore()
+        with patch("apps.common.redis_pool.redis.Redis", Mock()):
+            self.storage = RedisCartStorage(self.request)
+        self.conn = self.storage.conn
+
+    def test_load_without_cart(self):
+        assert self.storage.load() == {}
+        self.conn.hgetall.assert_not_called()
+        assert "cart_key" not in self.request.session
+
+    def test_load(self):
+        self.request.session["cart_key"] = "abc"
+        self.conn.hgetall.return_value = {
+            b"a": b"2", b"a:price": b"10.00",
+            b"b": b"1", b"b:price": b"5.00",
+        }
+
+        assert self.storage.load() == {
+            "a": {"quantity": 2, "price": "10.00"},
+            "b": {"quantity": 1, "price": "5.00"},
+        }
+        self.conn.hgetall.assert_called_once_with("cart:abc")
+
+    def test_add(self):
+        pipe = self.conn.pipeline.return_value
+        pipe.execute.return_value = [1, 3, [b"3", b"10.00"], True]
+
+        item = self.storage.add("a", 2, "12.00")
+
+        key = f"cart:{self.request.session['cart_key']}"
+        pipe.hsetnx.assert_called_once_with(key, "a:price", "12.00")
+        pipe.hincrby.assert_called_once_with(key, "a", 2)
+        pipe.expire.assert_called_once_with(key, 60)
+        assert item == {"quantity": 3, "price": "10.00"}
+
+    def test_remove_and_clear(self):
+        self.request.session["cart_key"] = "abc"
+
+        self.storage.remove("a")
+        self.conn.hdel.assert_called_once_with("cart:abc", "a", "a:price")
+
+        self.storage.clear()
+        self.conn.unlink.assert_called_once_with("cart:abc")
@@ -0,0 +1,77 @@
+import time
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+from redis.exceptions import RedisError
+
+from apps.common import cache as cache_module
+from apps.common import redis_pool
+from apps.common.circuit_breaker import CircuitBreaker
+
+# Nothing listens there, connections are refused.
+UNREACHABLE = "redis://127.0.0.1:1/0"
+CACHES = {
+    "default": {
+        "BACKEND": "apps.common.cache.RedisCache",
+        "LOCATION": "redis://cache:6379/2",
+    },
+    "unreachable": {
+        "BACKEND": "apps.common.cache.RedisCache",
+        "LOCATION": UNREACHABLE,
+        "OPTIONS": {"BUDGET": 0.05},
+    },
+}
+
+
+@override_settings(CACHES=CACHES, REDIS_CACHE_BREAKER_THRESHOLD=2)
+class RedisCacheTestCase(SimpleTestCase):
+
+    def setUp(self):
+        redis_pool._pools = {}
+        redis_pool._pools_pid = None
+        cache_module._breakers = {}
+
+    def tearDown(self):
+        redis_pool._pools = {}
+        redis_pool._pools_pid = None
+        cache_module._breakers = {}
+
+    def test_cache_draws_from_shared_pool(self):
+        client = caches["default"]._cache.get_client(write=True)
+
+        pool = redis_pool.get_connection_pool(
+            location="redis://cache:6379/2"
+        )
+        assert client.connection_pool is pool
+        assert pool.connection_kwargs["db"] == 2
+
+    def test_budget_pool(self):
+        client = caches["unreachable"]._cache.get_client()
+
+        pool = client.connection_pool
+        assert pool is redis_pool.get_connection_pool(0.05, UNREACHABLE)
+        assert pool.connection_kwargs["socket_timeout"] == 0.05
+        assert pool.connection_kwargs["socket_connect_timeout"] == 0.05
+
+    def test_fails_open(self):
+        cache = caches["unreachable"]
+
+        start = time.monotonic()
+        assert cache.get("key", "default") == "default"
+        assert cache.get_many(["key"]) == {}
+        assert time.monotonic() - start < 1
+        assert cache.breaker.state == CircuitBreaker.OPEN
+
+        # Refused without trying Redis while the breaker is open
+        with patch.object(cache_module.SharedPoolCacheClient,
+                          "get_client") as get_client:
+            cache.set("key", 1)
+            assert cache.add("key", 1) is False
+            assert cache.has_key("key") is False
+            assert cache.set_many({"key": 1}) == ["key"]
+        get_client.assert_not_called()
+
+    def test_deletions_raise(self):
+        with self.assertRaises(RedisError):
+            caches["unreachable"].delete("key")
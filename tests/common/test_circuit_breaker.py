@@ -0,0 +1,44 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from apps.common.circuit_breaker import CircuitBreaker
+
+
+@patch('apps.common.circuit_breaker.time.monotonic', return_value=100)
+class CircuitBreakerTestCase(SimpleTestCase):
+
+    def test_opens_after_threshold(self, monotonic):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        breaker.record_failure()
+        assert breaker.allow()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+
+    def test_success_resets_failures(self, monotonic):
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.CLOSED
+
+    def test_half_open_trial(self, monotonic):
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10)
+        breaker.record_failure()
+
+        monotonic.return_value = 110
+        assert breaker.allow()
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        # Only one trial call at a time
+        assert not breaker.allow()
+
+        # A failed trial opens the breaker again
+        breaker.record_failure()
+        assert breaker.state == CircuitBreaker.OPEN
+        assert not breaker.allow()
+
+        monotonic.return_value = 120
+        assert breaker.allow()
+        breaker.record_success()
+        assert breaker.state == CircuitBreaker.CLOSED
@@ -0,0 +1,25 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from apps.common import redis_pool
+
+
+class RedisPoolStatsTestCase(TestCase):
+
+    def tearDown(self):
+        redis_pool._pools = {}
+        redis_pool._pools_pid = None
+
+    def test_stats_for_staff_only(self):
+        response = self.client.get("/health/redis/")
+        assert response.status_code == 302
+
+        user = get_user_model().objects.create_user(
+            "staff", password="secret", is_staff=True
+        )
+        self.client.force_login(user)
+        redis_pool._pools = {}
+        redis_pool.get_connection_pool()
+        response = self.client.get("/health/redis/")
+        assert response.status_code == 200
+        assert response.json()["pools"][0]["created"] == 0
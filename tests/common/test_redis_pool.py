@@ -0,0 +1,68 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase
+
+from apps.common import redis_pool
+
+
+class RedisPoolTestCase(SimpleTestCase):
+
+    def setUp(self):
+        redis_pool._pools = {}
+        redis_pool._pools_pid = None
+
+    def tearDown(self):
+        redis_pool._pools = {}
+        redis_pool._pools_pid = None
+
+    def test_pool_is_shared(self):
+        pool = redis_pool.get_connection_pool()
+        assert redis_pool.get_connection_pool() is pool
+        conn = redis_pool.get_redis_connection()
+        assert conn.connection_pool is pool
+
+    def test_pool_per_timeout(self):
+        pool = redis_pool.get_connection_pool()
+        fast_pool = redis_pool.get_connection_pool(timeout=0.05)
+        assert fast_pool is not pool
+        assert fast_pool is redis_pool.get_connection_pool(timeout=0.05)
+        assert fast_pool.timeout == 0.05
+        assert fast_pool.connection_kwargs['socket_timeout'] == 0.05
+
+    def test_pool_is_recreated_after_fork(self):
+        pool = redis_pool.get_connection_pool()
+        with patch("apps.common.redis_pool.os.getpid", return_value=-1):
+            assert redis_pool.get_connection_pool() is not pool
+
+    def test_pool_stats(self):
+        assert redis_pool.pool_stats()["created"] == 0
+        pool = redis_pool.get_connection_pool()
+        # Check out a connection the way get_connection() does, sans socket.
+        pool.pool.get_nowait()
+        conn = pool.make_connection()
+        stats = redis_pool.pool_stats()
+        assert stats == {
+            "max": pool.max_connections, "created": 1, "in_use": 1, "idle": 0
+        }
+        pool.release(conn)
+        assert redis_pool.pool_stats()["idle"] == 1
+
+    def test_pool_per_location(self):
+        pool = redis_pool.get_connection_pool()
+        location = "redis://cache:6379/0"
+        cache_pool = redis_pool.get_connection_pool(location=location)
+        assert cache_pool is not pool
+        assert cache_pool is redis_pool.get_connection_pool(location=location)
+        assert cache_pool.connection_kwargs["host"] == "cache"
+        assert cache_pool.max_connections == pool.max_connections
+
+    def test_all_pool_stats(self):
+        assert redis_pool.all_pool_stats() == []
+        redis_pool.get_connection_pool()
+        redis_pool.get_connection_pool(timeout=0.05)
+
+        stats = redis_pool.all_pool_stats()
+        assert [(s["location"], s["timeout"]) for s in stats] == [
+            (None, None), (None, 0.05)
+        ]
+        assert stats[0]["created"] == 0
@@ -0,0 +1,81 @@
+from decimal import Decimal
+from unittest.mock import patch
+
+from django.test import Client, TestCase
+from django.urls import reverse
+from model_bakery import baker
+
+from apps.orders.models import Order
+from apps.shop.models import Product, ProductListing
+
+
+class OrderCreateTestCase(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        self.products = baker.make(
+            Product, name="Product", price=Decimal(10), _quantity=3
+        )
+        for product in self.products:
+            self.client.post(
+                reverse("cart:cart_add", args=[product.id]),
+                {"quantity": 2}
+            )
+        self.data = {
+            "first_name": "Jane", "last_name": "Doe",
+            "email": "jane@example.com", "address": "1 Main St",
+            "postal_code": "00100", "city": "Nairobi",
+        }
+
+    @patch("apps.orders.views.order_created")
+    def test_order_create(self, order_created):
+        self.products[0].price = Decimal(20)
+        self.products[0].save()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("orders:order_create"), self.data
+            )
+            # The task is only sent once the order is committed
+            order_created.delay.assert_not_called()
+
+        assert response.status_code == 302
+        order = Order.objects.get()
+        items = order.items.all()
+        assert len(items) == 3
+        # Prices as when the products were added to the cart
+        assert {item.price for item in items} == {Decimal(10)}
+        assert {item.quantity for item in items} == {2}
+
+        order_created.delay.assert_called_once_with(order.id)
+        assert self.client.session["order_no"] == order.order_no
+
+    @patch("apps.orders.views.order_created")
+    def test_order_create_refuses_removed_products(self, order_created):
+        ProductListing.objects.filter(product=self.products[0]).delete()
+
+        response = self.client.post(reverse("orders:order_create"), self.data)
+
+        assert response.status_code == 200
+        assert "no longer available" in response.content.decode()
+        assert not Order.objects.exists()
+        order_created.delay.assert_not_called()
+
+        # The customer can order the rest once they have seen it
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse("orders:order_create"), self.data
+            )
+        assert response.status_code == 302
+        assert Order.objects.get().items.count() == 2
+
+    @patch("apps.orders.views.order_created")
+    @patch("apps.orders.models.OrderItem.objects.bulk_create")
+    def test_order_create_is_atomic(self, bulk_create, order_created):
+        bulk_create.side_effect = RuntimeError
+
+        with self.assertRaises(RuntimeError):
+            self.client.post(reverse("orders:order_create"), self.data)
+
+        assert not Order.objects.exists()
+        order_created.delay.assert_not_called()
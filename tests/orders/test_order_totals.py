@@ -0,0 +1,48 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from model_bakery import baker
+
+from apps.orders.models import Order, OrderItem
+from apps.shop.models import Product
+
+
+class OrderTotalsTestCase(TestCase):
+
+    def setUp(self):
+        self.order = baker.make(Order, discount=10)
+        product = baker.make(Product, name="Product 1")
+        baker.make(
+            OrderItem, order=self.order, product=product,
+            price=Decimal("12.50"), quantity=2
+        )
+        baker.make(
+            OrderItem, order=self.order, product=product,
+            price=Decimal("5.00"), quantity=1
+        )
+        self.empty_order = baker.make(Order)
+
+    def assert_totals(self, order):
+        assert order.get_total_cost_before_discount() == Decimal("30.00")
+        assert order.get_discount() == Decimal("3.00")
+        assert order.get_total_cost() == Decimal("27.00")
+
+    def test_totals(self):
+        order = Order.objects.get(id=self.order.id)
+        with self.assertNumQueries(3):
+            self.assert_totals(order)
+
+    def test_with_totals(self):
+        with self.assertNumQueries(1):
+            orders = {o.id: o for o in Order.objects.with_totals()}
+            self.assert_totals(orders[self.order.id])
+            empty_order = orders[self.empty_order.id]
+            assert empty_order.get_total_cost() == Decimal(0)
+            assert empty_order.get_discount() == Decimal(0)
+
+    def test_with_items(self):
+        # Order and coupon, items, products, translations
+        with self.assertNumQueries(4):
+            order = Order.objects.with_items().get(id=self.order.id)
+            self.assert_totals(order)
+            assert len([item.product.name for item in order.items.all()]) == 2
@@ -0,0 +1,74 @@
+from unittest.mock import patch
+
+from django.test import TestCase
+from model_bakery import baker
+from redis.exceptions import RedisError
+
+from apps.orders.models import Order, OrderItem
+from apps.orders.tasks import record_order_purchases
+from apps.shop.models import Product
+
+
+@patch('apps.orders.tasks.Recommender')
+class RecordOrderPurchasesTestCase(TestCase):
+
+    def setUp(self):
+        self.product1 = baker.make(Product, name='Product 1')
+        self.product2 = baker.make(Product, name='Product 2')
+        self.order = baker.make(Order, paid=True)
+        baker.make(OrderItem, order=self.order, product=self.product1)
+        baker.make(OrderItem, order=self.order, product=self.product2)
+
+    def test_records_paid_order_once(self, recommender):
+        recommender.return_value.is_rebuilding.return_value = False
+        assert record_order_purchases(self.order.id) is True
+        # Webhook retries enqueue the task again
+        assert record_order_purchases(self.order.id) is False
+
+        live = recommender.return_value
+        live.record_order.assert_called_once()
+        order_id, product_ids = live.record_order.call_args.args
+        assert order_id == self.order.id
+        assert sorted(product_ids) == sorted(
+            [self.product1.id, self.product2.id]
+        )
+        live.invalidate_suggestions.assert_called_once_with(product_ids)
+        self.order.refresh_from_db()
+        assert self.order.purchases_recorded is True
+
+    def test_skips_unpaid_order(self, recommender):
+        Order.objects.filter(id=self.order.id).update(paid=False)
+
+        assert record_order_purchases(self.order.id) is False
+        recommender.return_value.record_order.assert_not_called()
+
+    def test_leaves_order_to_running_rebuild(self, recommender):
+        recommender.return_value.is_rebuilding.return_value = True
+
+        assert record_order_purchases(self.order.id) is False
+
+        recommender.return_value.record_order.assert_not_called()
+        self.order.refresh_from_db()
+        assert self.order.purchases_recorded is False
+
+    def test_failed_write_leaves_order_unrecorded(self, recommender):
+        recommender.return_value.is_rebuilding.return_value = False
+        record_order = recommender.return_value.record_order
+        record_order.side_effect = ConnectionError
+
+        with self.assertRaises(ConnectionError):
+            record_order_purchases(self.order.id)
+
+        self.order.refresh_from_db()
+        assert self.order.purchases_recorded is False
+
+    def test_failed_invalidation_keeps_claim(self, recommender):
+        live = recommender.return_value
+        live.is_rebuilding.return_value = False
+        live.invalidate_suggestions.side_effect = RedisError
+
+        assert record_order_purchases(self.order.id) is True
+
+        live.record_order.assert_called_once()
+        self.order.refresh_from_db()
+        assert self.order.purchases_recorded is True
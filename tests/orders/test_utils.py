@@ -0,0 +1,98 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connection
+from django.test import (
+    TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+)
+
+from apps.orders import utils
+from apps.orders.models import OrderNoSequence
+from apps.orders.utils import (
+    ALPHABET, allocate_block, encode, generate_order_no, scramble
+)
+
+
+@override_settings(ORDER_NO_LENGTH=6, ORDER_NO_BLOCK_SIZE=10)
+class GenerateOrderNoTestCase(TestCase):
+
+    def setUp(self):
+        utils._blocks = {}
+
+    def test_format(self):
+        order_no = generate_order_no()
+        assert len(order_no) == 6
+        assert set(order_no) <= set(ALPHABET)
+
+    def test_blocks_are_reserved_once_committed(self):
+        # Inside a transaction, a block only yields one number ...
+        generate_order_no()
+        assert OrderNoSequence.objects.get(length=6).next_value == 10
+
+        # ... the rest of it is used once the transaction commits.
+        with self.captureOnCommitCallbacks(execute=True):
+            first = generate_order_no()
+        with self.assertNumQueries(0):
+            rest = [generate_order_no() for _ in range(9)]
+        assert OrderNoSequence.objects.get(length=6).next_value == 20
+
+        assert len({first, *rest}) == 10
+        generate_order_no()
+        assert OrderNoSequence.objects.get(length=6).next_value == 30
+
+    @override_settings(ORDER_NO_LENGTH=2, ORDER_NO_BLOCK_SIZE=1)
+    def test_numbers_are_unique_until_exhausted(self):
+        numbers = {generate_order_no() for _ in range(32 ** 2)}
+
+        assert len(numbers) == 32 ** 2
+        with self.assertRaises(RuntimeError):
+            generate_order_no()
+
+    def test_scramble_is_one_to_one(self):
+        values = [scramble(value, 3) for value in range(32 ** 3)]
+        assert sorted(values) == list(range(32 ** 3))
+        assert values[:3] != [0, 1, 2]
+
+    def test_encode(self):
+        assert encode(0, 3) == "222"
+        assert encode(32 ** 3 - 1, 3) == "ZZZ"
+
+
+# SQLite has no row locks, concurrent allocations fail there.
+@skipUnlessDBFeature('has_select_for_update')
+@override_settings(ORDER_NO_LENGTH=6, ORDER_NO_BLOCK_SIZE=10)
+class ConcurrentAllocationTestCase(TransactionTestCase):
+    workers = 8
+    allocations = 25
+
+    def run_concurrently(self, allocate):
+        """
+        Run allocate() from several threads at once, each thread with its
+            own database connection, like processes serving orders.
+        """
+        barrier = threading.Barrier(self.workers)
+
+        def worker():
+            try:
+                barrier.wait()
+                return [allocate() for _ in range(self.allocations)]
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(self.workers) as executor:
+            futures = [executor.submit(worker) for _ in range(self.workers)]
+            return [value for f in futures for value in f.result()]
+
+    def test_blocks_do_not_overlap(self):
+        blocks = self.run_concurrently(lambda: allocate_block(6, 10))
+
+        values = [v for start, end in blocks for v in range(start, end)]
+        assert len(values) == self.workers * self.allocations * 10
+        assert len(set(values)) == len(values)
+        assert OrderNoSequence.objects.get(length=6).next_value == len(values)
+
+    def test_order_numbers_are_unique(self):
+        utils._blocks = {}
+        numbers = self.run_concurrently(generate_order_no)
+
+        assert len(set(numbers)) == self.workers * self.allocations
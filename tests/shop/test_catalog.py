@@ -0,0 +1,37 @@
+from django.test import TestCase
+from model_bakery import baker
+
+from apps.shop.catalog import get_catalog_cache, get_catalog_version
+from apps.shop.models import Category, Product
+
+
+class CatalogVersionTestCase(TestCase):
+
+    def setUp(self):
+        get_catalog_cache().clear()
+        self.product = baker.make(Product, name="Product", slug="product")
+
+    def test_version_is_stable(self):
+        assert get_catalog_version() == get_catalog_version()
+
+    def test_catalog_edits_bump_version(self):
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 42
+            self.product.save()
+            # Pages rendered before the commit must not be cached under
+            # the new version.
+            assert get_catalog_version() == version
+        assert get_catalog_version() != version
+
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.set_current_language("es")
+            self.product.name = "Producto"
+            self.product.save_translations()
+        assert get_catalog_version() != version
+
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            baker.make(Category, name="Bikes", slug="bikes").delete()
+        assert get_catalog_version() != version
@@ -0,0 +1,127 @@
+from io import StringIO
+from unittest.mock import Mock, patch
+
+from django.core.management import call_command
+from django.test import TestCase
+from model_bakery import baker
+
+from apps.orders.models import Order, OrderItem
+from apps.orders.tasks import record_order_purchases
+from apps.shop.models import Product
+
+
+@patch('apps.shop.management.commands.rebuild_recommendations.Recommender')
+class RebuildRecommendationsTestCase(TestCase):
+
+    def setUp(self):
+        self.products = baker.make(Product, _quantity=3)
+        self.orders = baker.make(Order, paid=True, _quantity=3)
+        for order in self.orders:
+            for product in self.products[:2]:
+                baker.make(OrderItem, order=order, product=product)
+        # Unpaid orders are not purchases
+        unpaid = baker.make(Order, paid=False)
+        baker.make(OrderItem, order=unpaid, product=self.products[2])
+
+    def test_rebuild_in_chunks(self, recommender):
+        call_command(
+            'rebuild_recommendations', chunk_size=2, stdout=StringIO()
+        )
+
+        live = recommender.return_value
+        live.clear_purchases.assert_called_once()
+        calls = live.bulk_product_ids_bought.call_args_list
+        assert [len(c.args[0]) for c in calls] == [2, 1]
+        for c in calls:
+            for product_ids in c.args[0]:
+                assert sorted(product_ids) == sorted(
+                    p.id for p in self.products[:2]
+                )
+        live.swap_in.assert_not_called()
+        live.start_rebuild.assert_called()
+        live.finish_rebuild.assert_called_once()
+        assert Order.objects.filter(purchases_recorded=True).count() == 3
+
+    def test_rebuild_shadow_swaps_in(self, recommender):
+        call_command('rebuild_recommendations', shadow=True, stdout=StringIO())
+
+        recommender.assert_any_call(namespace='rebuild:product')
+        recommender.return_value.swap_in.assert_called_once_with(
+            recommender.return_value
+        )
+
+
+@patch('apps.orders.tasks.Recommender')
+@patch('apps.shop.management.commands.rebuild_recommendations.Recommender')
+class RebuildRecommendationsConcurrencyTestCase(TestCase):
+
+    def setUp(self):
+        self.products = baker.make(Product, _quantity=2)
+        self.recorded = baker.make(Order, paid=True, purchases_recorded=True)
+        self.pending = baker.make(Order, paid=True)
+        self.later = baker.make(Order, paid=False)
+        for order in [self.recorded, self.pending, self.later]:
+            for product in self.products:
+                baker.make(OrderItem, order=order, product=product)
+
+    def run_rebuild(self, recommender, task_recommender, shadow):
+        """
+        Rebuild while tasks run for an order paid before the rebuild and one
+            paid during it. Both recommenders share a fake Redis flag, every
+            write is returned as (target, order count).
+        """
+        live = Mock()
+        shadow_target = Mock()
+        recommender.side_effect = (
+            lambda namespace='product': shadow_target
+            if namespace != 'product' else live
+        )
+        task_recommender.return_value = live
+        flag = []
+        live.start_rebuild.side_effect = lambda timeout: flag.append(timeout)
+        live.finish_rebuild.side_effect = flag.clear
+        live.is_rebuilding.side_effect = lambda: bool(flag)
+
+        def pay_during_rebuild(orders, **kwargs):
+            target.bulk_product_ids_bought.side_effect = None
+            Order.objects.filter(id=self.later.id).update(paid=True)
+            # Tasks of both orders, queued by the webhook
+            assert record_order_purchases(self.pending.id) is False
+            assert record_order_purchases(self.later.id) is False
+
+        target = shadow_target if shadow else live
+        target.bulk_product_ids_bought.side_effect = pay_during_rebuild
+        with patch(
+            'apps.shop.management.commands.rebuild_recommendations.'
+            'record_order_purchases.delay', side_effect=record_order_purchases
+        ):
+            call_command(
+                'rebuild_recommendations', shadow=shadow, stdout=StringIO()
+            )
+        return live, shadow_target
+
+    def assert_counted_once(self, rebuilt, replayed):
+        # The cutoff holds the orders paid before the rebuild, the order
+        # paid during it is recorded into live data afterwards.
+        rebuilt.bulk_product_ids_bought.assert_called_once()
+        assert len(rebuilt.bulk_product_ids_bought.call_args.args[0]) == 2
+        replayed.record_order.assert_called_once()
+        assert replayed.record_order.call_args.args[0] == self.later.id
+        assert Order.objects.filter(
+            paid=True, purchases_recorded=False
+        ).count() == 0
+
+    def test_purchases_during_rebuild(self, recommender, task_recommender):
+        live, _ = self.run_rebuild(recommender, task_recommender, False)
+
+        live.clear_purchases.assert_called_once()
+        self.assert_counted_once(live, live)
+
+    def test_purchases_during_shadow_rebuild(self, recommender,
+                                             task_recommender):
+        live, shadow = self.run_rebuild(recommender, task_recommender, True)
+
+        # Recorded into live data after the swap, not lost by it
+        live.swap_in.assert_called_once_with(shadow)
+        live.bulk_product_ids_bought.assert_not_called()
+        self.assert_counted_once(shadow, live)
@@ -0,0 +1,73 @@
+from decimal import Decimal
+
+from django.test import TestCase
+from model_bakery import baker
+
+from apps.shop.listings import refresh_listings
+from apps.shop.models import Category, Product, ProductListing
+
+
+class ProductListingTestCase(TestCase):
+
+    def setUp(self):
+        self.category = baker.make(Category, name="Bikes", slug="bikes")
+        self.product = baker.make(
+            Product, category=self.category, name="Bike", slug="bike",
+            price=Decimal(10)
+        )
+
+    def get_listing(self, language="en"):
+        return ProductListing.objects.get(
+            product=self.product, language_code=language
+        )
+
+    def test_listings_fall_back_to_default_language(self):
+        listings = ProductListing.objects.filter(product=self.product)
+        assert {listing.language_code for listing in listings} == {"en", "es"}
+        assert {listing.name for listing in listings} == {"Bike"}
+
+        self.product.set_current_language("es")
+        self.product.name = "Bicicleta"
+        self.product.slug = "bicicleta"
+        self.product.save_translations()
+
+        listing = self.get_listing("es")
+        assert (listing.name, listing.slug) == ("Bicicleta", "bicicleta")
+        assert listing.get_absolute_url() == self.product.get_absolute_url()
+        assert self.get_listing("en").name == "Bike"
+
+    def test_product_edits_refresh_listings(self):
+        self.product.price = Decimal(20)
+        self.product.available = False
+        self.product.save()
+
+        listing = self.get_listing()
+        assert listing.price == Decimal(20)
+        assert not listing.available
+
+    def test_category_edits_refresh_listings(self):
+        self.category.slug = "cycles"
+        self.category.save()
+
+        listing = self.get_listing()
+        assert listing.category_slug == "cycles"
+        assert listing.get_category_url() == self.category.get_absolute_url()
+
+    def test_deleting_translation_drops_listings(self):
+        self.product.delete_translation("en")
+        assert not ProductListing.objects.filter(
+            product=self.product
+        ).exists()
+
+    def test_deleting_product_drops_listings(self):
+        self.product.delete()
+        assert not ProductListing.objects.exists()
+
+    def test_refresh_listings(self):
+        baker.make(Product, category=self.category, name="Helmet")
+        ProductListing.objects.all().delete()
+        progress = []
+
+        assert refresh_listings(batch_size=1, progress=progress.append) == 4
+        assert progress == [2, 4]
+        assert ProductListing.objects.count() == 4
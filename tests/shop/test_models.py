@@ -126,3 +126,11 @@ class TestCategory(TestCase):
         baker.make(Category, name='Unique Slug', slug='unique-slug')
         with pytest.raises(IntegrityError):
             baker.make(Category, name='Unique Slug', slug='unique-slug')
+
+    # Tests that a Category slug can't shadow a shop URL
+    def test_category_reserved_slug(self):
+        category = baker.make(Category, name='Search', slug='search')
+        translation = category.get_translation(category.get_current_language())
+        with pytest.raises(ValidationError) as error:
+            translation.full_clean()
+        assert list(error.value.message_dict) == ['slug']
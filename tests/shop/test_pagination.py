@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.http import Http404
+from django.test import TestCase
+from django.utils import timezone
+from model_bakery import baker
+
+from apps.shop.models import Product
+from apps.shop.pagination import decode_cursor, paginate_keyset
+
+
+class PaginateKeysetTestCase(TestCase):
+
+    def setUp(self):
+        now = timezone.now()
+        products = baker.make(Product, _quantity=5)
+        # Two products created at the same time, ordered by id
+        for minutes, product in zip([1, 2, 3, 3, 4], products):
+            Product.objects.filter(id=product.id).update(
+                created=now - timedelta(minutes=minutes)
+            )
+        self.products = list(Product.objects.order_by("-created", "-id"))
+
+    def test_pages(self):
+        queryset = Product.objects.all()
+        first = paginate_keyset(queryset, 2)
+        assert first.object_list == self.products[:2]
+        assert not first.has_previous() and first.has_next()
+
+        second = paginate_keyset(queryset, 2, after=first.next_cursor)
+        assert second.object_list == self.products[2:4]
+        assert second.has_previous() and second.has_next()
+
+        last = paginate_keyset(queryset, 2, after=second.next_cursor)
+        assert last.object_list == self.products[4:]
+        assert last.has_previous() and not last.has_next()
+
+        # Going back returns the same pages
+        back = paginate_keyset(queryset, 2, before=last.previous_cursor)
+        assert back.object_list == second.object_list
+        assert back.next_cursor == second.next_cursor
+        back = paginate_keyset(queryset, 2, before=back.previous_cursor)
+        assert back.object_list == first.object_list
+        assert not back.has_previous()
+
+    def test_page_is_one_query(self):
+        first = paginate_keyset(Product.objects.all(), 2)
+        with self.assertNumQueries(1):
+            paginate_keyset(Product.objects.all(), 2, after=first.next_cursor)
+
+    def test_invalid_cursor(self):
+        with self.assertRaises(Http404):
+            decode_cursor("not-a-cursor")
@@ -0,0 +1,123 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase
+from model_bakery import baker
+
+from apps.shop.models import Category, Product, ProductListing
+
+
+class ProductListingQueryPlanTests:
+    """
+    Catalog reads must be index range scans, with no sort of the rows.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.categories = [
+            baker.make(Category, name=f"Category {i}", slug=f"category-{i}")
+            for i in range(3)
+        ]
+        for category in cls.categories:
+            baker.make(
+                Product, category=category, name="Product", _quantity=10
+            )
+            baker.make(
+                Product, category=category, name="Sold out", available=False,
+                _quantity=5
+            )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE")
+
+    def assertUsesIndex(self, queryset, index):
+        raise NotImplementedError
+
+    def get_pages(self, queryset):
+        """ The first, next and previous page queries of paginate_keyset(). """
+        listing = queryset.order_by("-created", "-product_id").first()
+        after = Q(created__lt=listing.created) | Q(
+            created=listing.created, product_id__lt=listing.product_id
+        )
+        before = Q(created__gt=listing.created) | Q(
+            created=listing.created, product_id__gt=listing.product_id
+        )
+        return [
+            queryset.order_by("-created", "-product_id")[:25],
+            queryset.filter(after).order_by("-created", "-product_id")[:25],
+            queryset.filter(before).order_by("created", "product_id")[:25],
+        ]
+
+    def test_product_list(self):
+        listings = ProductListing.objects.filter(
+            language_code="en", available=True
+        )
+        for page in self.get_pages(listings):
+            self.assertUsesIndex(page, "listing_available_idx")
+
+    def test_category_product_list(self):
+        listings = ProductListing.objects.filter(
+            language_code="en", available=True, category=self.categories[0]
+        )
+        for page in self.get_pages(listings):
+            self.assertUsesIndex(page, "listing_category_idx")
+
+
+@skipUnless(connection.vendor == "sqlite", "Asserts SQLite query plans.")
+class ProductListingQueryPlanTestCase(ProductListingQueryPlanTests, TestCase):
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        assert f"USING INDEX {index}" in plan, plan
+        assert "TEMP B-TREE" not in plan, plan
+
+    def test_product_detail(self):
+        listing = ProductListing.objects.first()
+        plan = ProductListing.objects.filter(
+            product_id=listing.product_id, language_code="en",
+            slug=listing.slug, available=True
+        ).explain()
+        assert "(product_id=? AND language_code=?)" in plan, plan
+
+
+@skipUnless(
+    connection.vendor == "postgresql", "Asserts PostgreSQL query plans."
+)
+class PostgresProductListingQueryPlanTestCase(
+    ProductListingQueryPlanTests, TestCase
+):
+    """
+    On a handful of rows PostgreSQL rightly prefers a sequential scan, the
+        listings are padded with other languages' rows until the planner
+        has to pick between the indexes.
+    """
+
+    languages = 200
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        ProductListing.objects.bulk_create(
+            ProductListing(
+                product_id=listing.product_id,
+                language_code=f"x{i}",
+                name=listing.name,
+                slug=listing.slug,
+                price=listing.price,
+                available=listing.available,
+                category_id=listing.category_id,
+                category_name=listing.category_name,
+                category_slug=listing.category_slug,
+                created=listing.created
+            )
+            for listing in ProductListing.objects.filter(language_code="en")
+            for i in range(cls.languages)
+        )
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE shop_productlisting")
+
+    def assertUsesIndex(self, queryset, index):
+        plan = queryset.explain()
+        assert f"using {index} on" in plan, plan
+        assert "Seq Scan" not in plan, plan
+        assert "Sort" not in plan, plan
@@ -1,8 +1,13 @@
-from unittest.mock import Mock, patch
+import math
+from unittest.mock import ANY, Mock, call, patch
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from model_bakery import baker
 
+from redis.exceptions import TimeoutError
+
+from apps.common import cache as cache_module
+from apps.shop import recommender as recommender_module
 from apps.shop.models import Product
 from apps.shop.recommender import Recommender
 
@@ -12,7 +17,7 @@ class RecommenderTestCase(TestCase):
     @classmethod
     def setUpClass(cls):
         super().setUpClass()
-        cls.redis_patch = patch('apps.shop.recommender.redis.Redis', Mock())
+        cls.redis_patch = patch('apps.common.redis_pool.redis.Redis', Mock())
         cls.redis_patch.start()
 
     @classmethod
@@ -22,6 +27,10 @@ class RecommenderTestCase(TestCase):
 
     def setUp(self):
         self.recommender = Recommender()
+        # The patched client is shared between tests.
+        self.recommender.conn.reset_mock()
+        self.recommender.cache.clear()
+        recommender_module._breaker = None
 
     def test_get_product_key(self):
         product_id = '4a2663f3-c227-47e7-bffe-c68a177e7e38'
@@ -39,9 +48,45 @@ class RecommenderTestCase(TestCase):
         self.recommender.products_bought([product1, product2])
 
         # Assertions related to the mocked Redis connection
-        self.recommender.conn.zincrby.assert_called_with(
+        pipe = self.recommender.conn.pipeline.return_value
+        pipe.zincrby.assert_any_call(
             self.recommender.get_product_key(product2.id), 1, str(product1.id),
         )
+        pipe.zincrby.assert_any_call(
+            self.recommender.get_product_key(product1.id), 1, str(product2.id),
+        )
+        pipe.execute.assert_called_once()
+
+    def test_bulk_products_bought_folds_pairs(self):
+        product1 = baker.make(Product, name='Product 1')
+        product2 = baker.make(Product, name='Product 2')
+        product3 = baker.make(Product, name='Product 3')
+        self.recommender.conn.pipeline.reset_mock()
+
+        self.recommender.bulk_products_bought(
+            iter([[product1, product2], [product1, product2, product3]]),
+            batch_size=10
+        )
+
+        # One pipeline for the whole batch, one write per distinct pair
+        self.recommender.conn.pipeline.assert_called_once_with(
+            transaction=True
+        )
+        pipe = self.recommender.conn.pipeline.return_value
+        self.assertEqual(pipe.zincrby.call_count, 6)
+        pipe.zincrby.assert_any_call(
+            self.recommender.get_product_key(product1.id), 2, str(product2.id),
+        )
+        pipe.zincrby.assert_any_call(
+            self.recommender.get_product_key(product3.id), 1, str(product1.id),
+        )
+        pipe.execute.assert_called_once()
+
+    def test_get_pair_counts(self):
+        counts = Recommender.get_pair_counts([['a', 'b'], ['a', 'b', 'c']])
+        self.assertEqual(counts[('a', 'b')], 2)
+        self.assertEqual(counts[('c', 'a')], 1)
+        self.assertNotIn(('a', 'a'), counts)
 
     def test_suggest_products_for_single_product(self):
         # Create test products using baker
@@ -55,16 +100,37 @@ class RecommenderTestCase(TestCase):
         products = [
             s.encode('utf-8') for s in [str(product1.id), str(product2.id)]
         ]
-        self.recommender.conn.zrange.return_value = products
+        self.recommender.conn.zrange.return_value = [
+            (products[1], 1.0), (products[0], 1.0)
+        ]
         self.recommender.conn.zrange.reset_mock()
 
-        self.recommender.suggest_products_for([product1])
+        with self.settings(RECOMMENDER_OVERFETCH=2):
+            suggestions = self.recommender.suggest_products_for(
+                [product1], max_results=1
+            )
 
-        # Assertions related to the mocked Redis connection
+        # Only the top max_results + overfetch members are read
         self.recommender.conn.zrange.assert_called_once_with(
             self.recommender.get_product_key(product1.id),
-            0, -1, desc=True
+            0, 2, desc=True, withscores=True
+        )
+        assert [p.id for p in suggestions] == [product2.id]
+
+    def test_suggest_products_for_single_product_min_score(self):
+        product1 = baker.make(Product, name='Product 1')
+        self.recommender.conn.zrevrangebyscore.return_value = []
+
+        with self.settings(RECOMMENDER_OVERFETCH=0):
+            self.recommender.suggest_products_for(
+                [product1], max_results=4, min_score=2
+            )
+
+        self.recommender.conn.zrevrangebyscore.assert_called_once_with(
+            self.recommender.get_product_key(product1.id), '+inf', 2,
+            start=0, num=4, withscores=True
         )
+        self.recommender.conn.zrange.assert_not_called()
 
     def test_suggest_products_for_multiple_products(self):
         # Create test products using baker
@@ -81,30 +147,385 @@ class RecommenderTestCase(TestCase):
             s.encode('utf-8') for s in [str(product1.id), str(product3.id)]
         ]
 
-        self.recommender.conn.zunionstore.return_value = products
-        self.recommender.conn.zrange.return_value = products
+        script = self.recommender.suggest_many_script
+        script.return_value = [products[0], b'3', products[1], b'1']
 
-        self.recommender.suggest_products_for([product1, product3])
+        with self.settings(RECOMMENDER_OVERFETCH=2):
+            suggestions = self.recommender.suggest_products_for(
+                [product1, product3], max_results=4
+            )
 
-        # Assertions related to the mocked Redis connection
-        flat_ids = "".join([str(id) for id in [product1.id, product3.id]])
-        tmp_key = f"tmp_{flat_ids}"
-        self.recommender.conn.zunionstore.assert_called_once()
-        self.recommender.conn.zrem.assert_called_once()
-        self.recommender.conn.zrange.assert_called_once_with(
-            tmp_key, 0, -1, desc=True)
-        self.recommender.conn.zrange.reset_mock()
+        # Union, exclusion and top-N happen in one scripted call
+        script.assert_called_once()
+        keys = script.call_args.kwargs['keys']
+        args = script.call_args.kwargs['args']
+        assert keys[0].startswith('tmp:suggest:')
+        assert keys[1] == 'product:decay:anchors'
+        assert keys[2:] == [
+            self.recommender.get_product_key(product1.id),
+            self.recommender.get_product_key(product3.id),
+        ]
+        assert args[:2] == [6, '-inf']
+        assert args[3:] == [0, str(product1.id), str(product3.id)]
+        assert [p.id for p in suggestions] == [product1.id, product3.id]
+        self.recommender.conn.zunionstore.assert_not_called()
+        self.recommender.conn.zrange.assert_not_called()
 
-    def test_clear_purchases(self):
-        # Create test products using baker
+    def test_suggest_products_for_is_cached(self):
         product1 = baker.make(Product, name='Product 1')
         product2 = baker.make(Product, name='Product 2')
+        product3 = baker.make(Product, name='Product 3')
+        self.recommender.conn.zrange.return_value = [
+            (str(product2.id).encode('utf-8'), 1.0)
+        ]
 
-        # Simulate products bought together
+        first = self.recommender.suggest_products_for([product1])
+        second = self.recommender.suggest_products_for([product1])
+
+        assert first == second
+        assert [p.id for p in first] == [product2.id]
+        self.recommender.conn.zrange.assert_called_once()
+
+        # Purchases involving the product drop its cached suggestions ...
         self.recommender.products_bought([product1, product2])
+        self.recommender.suggest_products_for([product1])
+        assert self.recommender.conn.zrange.call_count == 2
+
+        # ... but leave other products' entries alone.
+        self.recommender.suggest_products_for([product3])
+        self.recommender.products_bought([product1, product2])
+        self.recommender.suggest_products_for([product3])
+        assert self.recommender.conn.zrange.call_count == 3
+
+    def test_suggest_products_for_many(self):
+        product1 = baker.make(Product, name='Product 1')
+        product2 = baker.make(Product, name='Product 2')
+        product3 = baker.make(Product, name='Product 3')
+        pipe = self.recommender.read_conn.pipeline.return_value
+        pipe.reset_mock()
+        pipe.execute.return_value = [
+            [(str(product2.id).encode('utf-8'), 2.0),
+             (str(product3.id).encode('utf-8'), 1.0)],
+            [(str(product1.id).encode('utf-8'), 2.0)],
+        ]
+        self.recommender.conn.zrange.return_value = []
+        self.recommender.suggest_products_for([product3], max_results=2)
+        self.recommender.conn.zrange.reset_mock()
+
+        # One query for the listings of all suggested products
+        with self.settings(RECOMMENDER_OVERFETCH=0), \
+                self.assertNumQueries(1):
+            suggestions = self.recommender.suggest_products_for_many(
+                [product1, product2, product3], max_results=2
+            )
+
+        # Only the cache misses are read, in one round-trip
+        pipe.zrange.assert_has_calls([
+            call(self.recommender.get_product_key(product1.id),
+                 0, 1, desc=True, withscores=True),
+            call(self.recommender.get_product_key(product2.id),
+                 0, 1, desc=True, withscores=True),
+        ])
+        assert pipe.zrange.call_count == 2
+        pipe.execute.assert_called_once()
+        assert {
+            id: [p.id for p in products]
+            for id, products in suggestions.items()
+        } == {
+            str(product1.id): [product2.id, product3.id],
+            str(product2.id): [product1.id],
+            str(product3.id): [],
+        }
+        # Entries are shared with suggest_products_for()
+        assert self.recommender.suggest_products_for(
+            [product1], max_results=2
+        ) == suggestions[str(product1.id)]
+        self.recommender.conn.zrange.assert_not_called()
+
+    def test_cache_key_ignores_product_order(self):
+        key = self.recommender.get_cache_key(['a', 'b'], 4, None)
+        assert key == self.recommender.get_cache_key(['b', 'a'], 4, None)
+        assert key != self.recommender.get_cache_key(['a', 'b'], 6, None)
+
+    def test_cold_versions_cost_two_round_trips(self):
+        cache = self.recommender.cache
+        with patch.object(
+            cache, 'get_many', wraps=cache.get_many
+        ) as get_many, patch.object(
+            cache, 'set_many', wraps=cache.set_many
+        ) as set_many, patch.object(cache, 'add') as add:
+            versions = self.recommender.get_versions(['a', 'b', 'c'])
+
+        get_many.assert_called_once()
+        set_many.assert_called_once()
+        assert len(set_many.call_args.args[0]) == 4
+        add.assert_not_called()
+        assert len(set(versions)) == 3
+        assert self.recommender.get_versions(['c', 'a']) == [
+            versions[2], versions[0]
+        ]
+
+    def test_hydrate_keeps_rank_and_backfills_unavailable(self):
+        product1 = baker.make(Product, name='Product 1')
+        product2 = baker.make(Product, name='Product 2', available=False)
+        product3 = baker.make(Product, name='Product 3')
+        product4 = baker.make(Product, name='Product 4')
+        ranked_ids = [str(p.id) for p in [product3, product2, product1]]
+        ranked_ids += [str(product4.id)]
+
+        # One query for the listings, names included
+        with self.assertNumQueries(1):
+            products = self.recommender.hydrate(ranked_ids, max_results=3)
+            names = [p.name for p in products]
+
+        assert [p.id for p in products] == [
+            product3.id, product1.id, product4.id
+        ]
+        assert names == ['Product 3', 'Product 1', 'Product 4']
+
+    def test_clear_purchases(self):
+        keys = [
+            self.recommender.get_product_key(id).encode('utf-8')
+            for id in ['a', 'b', 'c']
+        ]
+        self.recommender.conn.scan_iter.return_value = iter(keys)
+        self.recommender.conn.unlink.side_effect = lambda *keys: len(keys)
+        progress = Mock()
 
         # Clear purchases
-        self.recommender.clear_purchases()
+        deleted = self.recommender.clear_purchases(
+            batch_size=2, progress=progress
+        )
 
         # Assertions related to the mocked Redis connection
-        self.recommender.conn.delete.assert_called()
+        self.recommender.conn.scan_iter.assert_called_once_with(
+            match='product:*:purchased_with', count=2
+        )
+        self.recommender.conn.unlink.assert_has_calls([
+            call(*keys[:2]), call(keys[2])
+        ])
+        self.recommender.conn.delete.assert_not_called()
+        progress.assert_has_calls([call(2), call(3)])
+        assert deleted == 3
+
+    def test_swap_in(self):
+        shadow = Recommender(namespace='rebuild:product')
+        self.recommender.conn.scan_iter.side_effect = [
+            # Live keys, then shadow keys
+            [b'product:a:purchased_with', b'product:b:purchased_with'],
+            [b'rebuild:product:a:purchased_with'],
+        ]
+
+        # The shadow was built without time-decay anchors
+        self.recommender.conn.exists.return_value = 0
+
+        assert self.recommender.swap_in(shadow) == 1
+
+        self.recommender.conn.pipeline.assert_called_once_with(
+            transaction=True
+        )
+        pipe = self.recommender.conn.pipeline.return_value
+        pipe.rename.assert_called_once_with(
+            b'rebuild:product:a:purchased_with', b'product:a:purchased_with'
+        )
+        pipe.unlink.assert_has_calls([
+            call(b'product:b:purchased_with'), call('product:decay:anchors')
+        ])
+        pipe.execute.assert_called_once()
+        self.recommender.conn.scan_iter.side_effect = None
+
+    def test_invalidate_all_suggestions_keeps_cache(self):
+        key = self.recommender.get_cache_key(['a', 'b'], 4, None)
+        self.recommender.cache.set('other', 1)
+
+        with patch.object(self.recommender.cache, 'clear') as clear:
+            self.recommender.invalidate_all_suggestions()
+        clear.assert_not_called()
+
+        assert key != self.recommender.get_cache_key(['a', 'b'], 4, None)
+        assert self.recommender.cache.get('other') == 1
+
+    def test_record_order_once(self):
+        pipe = self.recommender.conn.pipeline.return_value
+        pipe.exists.return_value = 0
+
+        assert self.recommender.record_order('o', ['a', 'b']) is True
+
+        key = 'product:order:o:recorded'
+        pipe.watch.assert_called_once_with(key)
+        pipe.multi.assert_called_once()
+        pipe.set.assert_called_once_with(key, 1, ex=86400)
+        pipe.zincrby.assert_has_calls([
+            call('product:a:purchased_with', 1, 'b'),
+            call('product:b:purchased_with', 1, 'a'),
+        ], any_order=True)
+        pipe.execute.assert_called_once()
+
+        # A retry after the write went through changes nothing
+        pipe.reset_mock()
+        pipe.exists.return_value = 1
+        assert self.recommender.record_order('o', ['a', 'b']) is False
+        pipe.zincrby.assert_not_called()
+        pipe.execute.assert_not_called()
+        pipe.reset.assert_called_once()
+
+    def test_rebuild_flag(self):
+        conn = self.recommender.conn
+        self.recommender.start_rebuild(60)
+        conn.set.assert_called_once_with('product:rebuild:running', 1, ex=60)
+
+        conn.exists.return_value = 1
+        assert self.recommender.is_rebuilding() is True
+        conn.exists.return_value = 0
+        assert self.recommender.is_rebuilding() is False
+
+        self.recommender.finish_rebuild()
+        conn.unlink.assert_called_once_with('product:rebuild:running')
+
+    def test_get_decay_rate(self):
+        with self.settings(RECOMMENDER_DECAY_HALF_LIFE=0):
+            assert Recommender.get_decay_rate() == 0
+        with self.settings(RECOMMENDER_DECAY_HALF_LIFE=1):
+            rate = Recommender.get_decay_rate()
+            assert math.isclose(math.exp(-rate * 24 * 60 * 60), 0.5)
+
+    def test_products_bought_with_decay(self):
+        product1 = baker.make(Product, name='Product 1')
+        product2 = baker.make(Product, name='Product 2')
+        script = self.recommender.increment_script
+
+        with self.settings(RECOMMENDER_DECAY_HALF_LIFE=30):
+            self.recommender.products_bought([product1, product2])
+            rate = Recommender.get_decay_rate()
+
+        pipe = self.recommender.conn.pipeline.return_value
+        pipe.zincrby.assert_not_called()
+        assert script.call_count == 2
+        script.assert_any_call(
+            keys=[
+                'product:decay:anchors',
+                self.recommender.get_product_key(product1.id)
+            ],
+            args=[
+                str(product1.id), ANY, rate,
+                str(product2.id), 1
+            ],
+            client=pipe
+        )
+        pipe.execute.assert_called_once()
+
+    def test_compact_purchases(self):
+        self.recommender.conn.scan_iter.return_value = iter([
+            b'product:a:purchased_with', b'product:b:purchased_with'
+        ])
+        script = self.recommender.compact_script
+
+        with self.settings(
+            RECOMMENDER_MAX_RELATED=10, RECOMMENDER_DECAY_MIN_SCORE=0.5
+        ):
+            assert self.recommender.compact_purchases(batch_size=1) == 2
+
+        pipe = self.recommender.conn.pipeline.return_value
+        script.assert_any_call(
+            keys=['product:decay:anchors', b'product:b:purchased_with'],
+            args=['b', ANY, 0, 10, 0.5],
+            client=pipe
+        )
+        assert pipe.execute.call_count == 3
+
+    @patch('apps.shop.recommender.Recommender.get_fallback')
+    def test_suggestions_fall_back_when_redis_fails(self, get_fallback):
+        fallback = get_fallback.return_value
+        fallback.get_scored_suggestions.return_value = [('b', 1.0)]
+        self.recommender.conn.zrange.side_effect = TimeoutError
+
+        with self.settings(RECOMMENDER_BREAKER_THRESHOLD=2):
+            for _ in range(3):
+                assert self.recommender.get_scored_suggestions(['a'], 4) == [
+                    ('b', 1.0)
+                ]
+
+        # The breaker opened after two failures, Redis was skipped after
+        assert self.recommender.conn.zrange.call_count == 2
+        fallback.get_scored_suggestions.assert_called_with(['a'], 4, None)
+        assert fallback.get_scored_suggestions.call_count == 3
+        self.recommender.conn.zrange.side_effect = None
+
+    @patch('apps.shop.recommender.Recommender.get_fallback')
+    def test_unexpected_errors_reopen_breaker(self, get_fallback):
+        get_fallback.return_value.get_scored_suggestions.return_value = []
+        self.recommender.conn.zrange.side_effect = TimeoutError
+
+        with self.settings(RECOMMENDER_BREAKER_THRESHOLD=1,
+                           RECOMMENDER_BREAKER_RESET_TIMEOUT=0):
+            self.recommender.get_scored_suggestions(['a'], 4)
+            breaker = self.recommender.get_breaker()
+            assert breaker.state == breaker.OPEN
+
+            # The half-open trial call fails with something else ...
+            self.recommender.conn.zrange.side_effect = ValueError
+            with self.assertRaises(ValueError):
+                self.recommender.get_scored_suggestions(['a'], 4)
+            assert breaker.state == breaker.OPEN
+
+            # ... and Redis is still tried again later.
+            self.recommender.conn.zrange.side_effect = None
+            self.recommender.conn.zrange.return_value = [(b'b', 1.0)]
+            assert self.recommender.get_scored_suggestions(['a'], 4) == [
+                ('b', 1.0)
+            ]
+            assert breaker.state == breaker.CLOSED
+
+    def test_suggestions_from_configured_backend(self):
+        with self.settings(
+            RECOMMENDER_BACKEND='apps.shop.similarity.SimilarityBackend'
+        ), patch(
+            'apps.shop.similarity.SimilarityBackend.get_scored_suggestions',
+            return_value=[('b', 0.5)]
+        ) as get_scored_suggestions:
+            assert self.recommender.get_scored_suggestions(['a'], 4) == [
+                ('b', 0.5)
+            ]
+
+        get_scored_suggestions.assert_called_once_with(['a'], 4, None)
+        self.recommender.conn.zrange.assert_not_called()
+
+
+@override_settings(CACHES={
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'catalog': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recommendations': {
+        'BACKEND': 'apps.common.cache.RedisCache',
+        # Nothing listens there, connections are refused.
+        'LOCATION': 'redis://127.0.0.1:1/0',
+        'OPTIONS': {'BUDGET': 0.025},
+    },
+})
+class RecommenderCacheDownTestCase(TestCase):
+
+    def setUp(self):
+        cache_module._breakers = {}
+
+    def tearDown(self):
+        cache_module._breakers = {}
+
+    def test_unreachable_cache_is_a_miss(self):
+        product1 = baker.make(Product, name='Product 1')
+        product2 = baker.make(Product, name='Product 2')
+
+        ranked = [(str(product2.id), 1.0)]
+        with patch.object(
+            Recommender, 'get_scored_suggestions', return_value=ranked
+        ), patch.object(
+            Recommender, 'get_scored_suggestions_many',
+            return_value={str(product1.id): ranked}
+        ):
+            suggestions = Recommender().suggest_products_for([product1])
+            many = Recommender().suggest_products_for_many([product1])
+
+        assert [p.id for p in suggestions] == [product2.id]
+        assert [p.id for p in many[str(product1.id)]] == [product2.id]
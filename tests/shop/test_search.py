@@ -0,0 +1,120 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from model_bakery import baker
+
+from apps.shop.catalog import get_catalog_cache
+from apps.shop.models import Category, Product, ProductListing
+from apps.shop.search import get_suggestions, normalize_term, search_listings
+
+
+class SearchTestCase(TestCase):
+
+    def setUp(self):
+        get_catalog_cache().clear()
+        category = baker.make(Category, name="Bikes", slug="bikes")
+        self.bike = baker.make(
+            Product, category=category, name="Mountain bike",
+            slug="mountain-bike", description="Front suspension"
+        )
+        self.helmet = baker.make(
+            Product, category=category, name="Helmet", slug="helmet",
+            description="For mountain trails"
+        )
+        baker.make(
+            Product, category=category, name="Mountain boots",
+            slug="mountain-boots", available=False
+        )
+
+    def test_normalize_term(self):
+        assert normalize_term("  mountain \n bike ") == "mountain bike"
+        assert len(normalize_term("a" * 500)) == 100
+
+    def test_search_listings(self):
+        listings = search_listings("mountain", "en")
+        assert {listing.id for listing in listings} == {
+            self.bike.id, self.helmet.id
+        }
+        assert not search_listings("saddle", "en").exists()
+
+    def test_suggestions_are_cached(self):
+        with self.assertNumQueries(1):
+            suggestions = get_suggestions("Mountain", "en")
+        assert suggestions == [{
+            "name": "Mountain bike", "url": self.bike.get_absolute_url()
+        }]
+        with self.assertNumQueries(0):
+            assert get_suggestions(" mountain ", "en") == suggestions
+
+        # Catalog edits show up right away
+        with self.captureOnCommitCallbacks(execute=True):
+            self.helmet.name = "Mountain helmet"
+            self.helmet.save_translations()
+        assert len(get_suggestions("mountain", "en")) == 2
+
+    def test_short_terms_get_no_suggestions(self):
+        with self.assertNumQueries(0):
+            assert get_suggestions(" m ", "en") == []
+
+
+@override_settings(SHOP_PAGE_SIZE=1)
+class SearchViewTestCase(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        get_catalog_cache().clear()
+        category = baker.make(Category, name="Bikes", slug="bikes")
+        for i in range(2):
+            baker.make(
+                Product, category=category, name=f"Bike {i}",
+                slug=f"bike-{i}"
+            )
+
+    def test_product_search(self):
+        response = self.client.get("/en/search/", {"q": "bike"})
+        page = response.context["page"]
+        assert len(page) == 1
+        assert page.has_next()
+
+        response = self.client.get("/en/search/", {"q": "bike", "page": 2})
+        assert len(response.context["page"]) == 1
+
+        response = self.client.get("/en/search/")
+        assert response.context["page"] is None
+
+    def test_product_search_suggest(self):
+        response = self.client.get("/en/search/suggest/", {"q": "bike"})
+        assert [s["name"] for s in response.json()["suggestions"]] == [
+            "Bike 0", "Bike 1"
+        ]
+
+
+@skipUnless(connection.vendor == "postgresql", "PostgreSQL search.")
+class PostgreSQLSearchTestCase(TestCase):
+
+    def setUp(self):
+        category = baker.make(Category, name="Bikes", slug="bikes")
+        self.bike = baker.make(
+            Product, category=category, name="Mountain bike",
+            slug="mountain-bike", description="Front suspension"
+        )
+        self.helmet = baker.make(
+            Product, category=category, name="Helmet", slug="helmet",
+            description="For mountain trails"
+        )
+
+    def test_search_vectors_are_maintained(self):
+        assert not ProductListing.objects.filter(
+            search_vector__isnull=True
+        ).exists()
+
+    def test_name_matches_rank_first(self):
+        listings = search_listings("mountains", "en")
+        assert [listing.id for listing in listings] == [
+            self.bike.id, self.helmet.id
+        ]
+
+    def test_typos_match_names(self):
+        listings = search_listings("helmt", "en")
+        assert [listing.id for listing in listings] == [self.helmet.id]
@@ -0,0 +1,77 @@
+import math
+import os
+import tempfile
+
+from django.test import TestCase
+from model_bakery import baker
+
+from apps.orders.models import Order, OrderItem
+from apps.shop.models import Product
+from apps.shop.similarity import (SimilarityBackend, build_similarity_index,
+                                  get_order_product_matrix, get_similarities)
+
+
+class SimilarityTestCase(TestCase):
+
+    def setUp(self):
+        self.a, self.b, self.c = baker.make(Product, _quantity=3)
+        # a+b twice, a+c once, b alone once
+        for products in [[self.a, self.b], [self.a, self.b],
+                         [self.a, self.c], [self.b]]:
+            order = baker.make(Order, paid=True)
+            for product in products:
+                baker.make(OrderItem, order=order, product=product)
+        # Unpaid orders are ignored
+        order = baker.make(Order, paid=False)
+        baker.make(OrderItem, order=order, product=self.c)
+        baker.make(OrderItem, order=order, product=self.b)
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'similarity.snap')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def get_similarity(self, metric, first, second):
+        matrix, product_ids = get_order_product_matrix()
+        rows = get_similarities(matrix, metric, batch_size=2)
+        matrix = [row for block in rows for row in block.toarray()]
+        return matrix[product_ids.index(str(first.id))][
+            product_ids.index(str(second.id))
+        ]
+
+    def test_order_product_matrix(self):
+        matrix, product_ids = get_order_product_matrix()
+        assert matrix.shape == (4, 3)
+        assert matrix.sum() == 7
+
+    def test_metrics(self):
+        # n_a = 3, n_b = 3, c_ab = 2, 4 orders
+        assert math.isclose(
+            self.get_similarity('cosine', self.a, self.b), 2 / 3
+        )
+        assert math.isclose(
+            self.get_similarity('jaccard', self.a, self.b), 2 / 4
+        )
+        assert math.isclose(
+            self.get_similarity('lift', self.a, self.b), 2 * 4 / 9
+        )
+        assert self.get_similarity('cosine', self.b, self.c) == 0
+        assert self.get_similarity('cosine', self.a, self.a) == 0
+
+    def test_unknown_metric(self):
+        matrix, _ = get_order_product_matrix()
+        with self.assertRaises(ValueError):
+            list(get_similarities(matrix, 'euclid'))
+
+    def test_build_and_serve_index(self):
+        build_similarity_index(path=self.path, top_k=1)
+
+        backend = SimilarityBackend(path=self.path)
+        # Loaded off the request thread otherwise
+        backend.load()
+        suggestions = backend.get_scored_suggestions([str(self.a.id)], 6)
+        assert [id for id, _ in suggestions] == [str(self.b.id)]
+        suggestions = backend.get_scored_suggestions(
+            [str(self.b.id), str(self.c.id)], 6
+        )
+        assert [id for id, _ in suggestions] == [str(self.a.id)]
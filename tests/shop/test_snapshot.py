@@ -0,0 +1,108 @@
+import os
+import tempfile
+import threading
+from unittest.mock import Mock, patch
+
+from django.test import SimpleTestCase
+
+from apps.shop.snapshot import Snapshot, SnapshotBackend, build_snapshot
+
+
+class SnapshotTestCase(SimpleTestCase):
+
+    def setUp(self):
+        self.snapshot = Snapshot.from_rows([
+            ('a', [('b', 3.0), ('c', 1.0), ('d', 2.0)]),
+            ('b', [('a', 3.0), ('c', 4.0)]),
+        ])
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, 'recommender.snap')
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_single_product(self):
+        assert self.snapshot.get_scored_suggestions(['a'], 2) == [
+            ('b', 3.0), ('d', 2.0)
+        ]
+        assert self.snapshot.get_scored_suggestions(['a'], 6, 2.0) == [
+            ('b', 3.0), ('d', 2.0)
+        ]
+        assert self.snapshot.get_scored_suggestions(['c'], 6) == []
+
+    def test_multiple_products(self):
+        # c: 1 + 4, d: 2, a and b excluded
+        assert self.snapshot.get_scored_suggestions(['a', 'b'], 6) == [
+            ('c', 5.0), ('d', 2.0)
+        ]
+        assert self.snapshot.get_scored_suggestions(['a', 'b'], 1) == [
+            ('c', 5.0)
+        ]
+
+    def test_save_and_load(self):
+        self.snapshot.save(self.path)
+        loaded = Snapshot.load(self.path)
+        assert loaded.product_ids == self.snapshot.product_ids
+        assert loaded.indptr == self.snapshot.indptr
+        assert loaded.indices == self.snapshot.indices
+        assert loaded.scores == self.snapshot.scores
+
+    def test_backend(self):
+        backend = SnapshotBackend(path=self.path)
+        with self.settings(RECOMMENDER_SNAPSHOT_CHECK_INTERVAL=0), \
+                patch.object(SnapshotBackend, 'preload') as preload:
+            # No snapshot yet
+            backend.load()
+            assert backend.get_scored_suggestions(['a'], 1) == []
+            self.snapshot.save(self.path)
+            backend.load()
+            assert backend.get_scored_suggestions(['a'], 1) == [('b', 3.0)]
+        # Each read past the check interval schedules a reload
+        assert preload.call_count == 2
+
+    def test_backend_loads_in_background(self):
+        self.snapshot.save(self.path)
+        backend = SnapshotBackend(path=self.path)
+        loading = threading.Event()
+        release = threading.Event()
+
+        def load(path):
+            loading.set()
+            release.wait(5)
+            return Snapshot.from_rows([('a', [('b', 3.0)])])
+
+        with patch.object(Snapshot, 'load', side_effect=load):
+            # Requests don't wait for the snapshot ...
+            assert backend.get_scored_suggestions(['a'], 1) == []
+            assert loading.wait(5)
+            assert backend.get_scored_suggestions(['a'], 1) == []
+            # ... nor start another load while one is running.
+            assert backend.preload() is None
+
+            release.set()
+            for thread in threading.enumerate():
+                if thread.name == 'recommender-snapshot':
+                    thread.join(5)
+        assert backend.get_scored_suggestions(['a'], 1) == [('b', 3.0)]
+
+    def test_build_snapshot(self):
+        recommender = Mock(namespace='product')
+        recommender.get_decay_rate.return_value = 0
+        recommender.get_product_key.return_value = 'product:*:purchased_with'
+        recommender.conn.hgetall.return_value = {}
+        recommender.conn.scan_iter.return_value = [
+            b'product:a:purchased_with'
+        ]
+        recommender.conn.pipeline.return_value.execute.return_value = [
+            [(b'b', 3.0), (b'c', 1.0)]
+        ]
+
+        snapshot = build_snapshot(recommender, path=self.path, max_related=2)
+
+        recommender.conn.pipeline.return_value.zrange.assert_called_once_with(
+            b'product:a:purchased_with', 0, 1, desc=True, withscores=True
+        )
+        assert Snapshot.load(self.path).get_scored_suggestions(['a'], 6) == [
+            ('b', 3.0), ('c', 1.0)
+        ]
+        assert snapshot.product_ids == ['a', 'b', 'c']
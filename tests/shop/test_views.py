@@ -0,0 +1,144 @@
+import time
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import Client, TestCase, override_settings
+from model_bakery import baker
+
+from apps.common import cache as cache_module
+from apps.common import redis_pool
+from apps.shop import recommender as recommender_module
+from apps.shop.models import Category, Product
+
+# Nothing listens there, connections are refused.
+UNREACHABLE = {
+    "BACKEND": "apps.common.cache.RedisCache",
+    "LOCATION": "redis://127.0.0.1:1/0",
+    "OPTIONS": {"BUDGET": 0.025},
+}
+
+
+@override_settings(SHOP_PAGE_SIZE=3)
+class ProductListTestCase(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        caches["catalog"].clear()
+        self.category = baker.make(Category, name="Bikes", slug="bikes")
+        for i in range(5):
+            baker.make(
+                Product, category=self.category, name=f"Product {i}",
+                slug=f"product-{i}"
+            )
+
+    def test_product_list_is_paginated(self):
+        # Product listings, categories and their translations
+        with self.assertNumQueries(3):
+            response = self.client.get("/en/")
+        page = response.context["page"]
+        assert len(page) == 3
+        assert page.has_next() and not page.has_previous()
+
+        response = self.client.get("/en/", {"after": page.next_cursor})
+        assert len(response.context["page"]) == 2
+        assert response.context["page"].has_previous()
+
+    def test_product_list_queries_do_not_grow(self):
+        baker.make(
+            Product, category=self.category, name="Product 5",
+            slug="product-5", _quantity=10
+        )
+        with self.assertNumQueries(4):
+            self.client.get("/en/bikes/")
+
+    def test_product_list_is_cached(self):
+        response = self.client.get("/en/")
+        with self.assertNumQueries(0):
+            assert self.client.get("/en/").content == response.content
+
+        # Catalog edits show up right away
+        product = Product.objects.order_by("-created", "-id").first()
+        with self.captureOnCommitCallbacks(execute=True):
+            product.name = "Renamed"
+            product.save_translations()
+        with self.assertNumQueries(3):
+            response = self.client.get("/en/")
+        assert b"Renamed" in response.content
+
+
+class ProductDetailTestCase(TestCase):
+
+    def setUp(self):
+        self.client = Client()
+        caches["catalog"].clear()
+        self.product = baker.make(
+            Product, name="Product", slug="product",
+            description="Lorem ipsum",
+            category=baker.make(Category, name="Bikes", slug="bikes")
+        )
+
+    @patch("apps.shop.views.Recommender")
+    def test_product_detail_is_cached(self, recommender):
+        recommender.return_value.suggest_products_for.return_value = []
+        url = self.product.get_absolute_url()
+        response = self.client.get(url)
+        assert b"Lorem ipsum" in response.content
+
+        # The listing comes from the cache
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        assert b"Lorem ipsum" in response.content
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 42
+            self.product.save()
+        response = self.client.get(url)
+        assert b"$ 42" in response.content
+        # The add to cart form is never cached
+        assert b"csrfmiddlewaretoken" in response.content
+
+
+@override_settings(
+    CACHES={
+        alias: UNREACHABLE
+        for alias in ["default", "recommendations", "catalog"]
+    },
+    REDIS_HOST="127.0.0.1", REDIS_PORT=1
+)
+class RedisDownTestCase(TestCase):
+
+    def setUp(self):
+        self.reset()
+        self.product = baker.make(
+            Product, name="Product", slug="product",
+            category=baker.make(Category, name="Bikes", slug="bikes")
+        )
+
+    def tearDown(self):
+        self.reset()
+
+    def reset(self):
+        redis_pool._pools = {}
+        redis_pool._pools_pid = None
+        cache_module._breakers = {}
+        recommender_module._breaker = None
+
+    def test_product_detail(self):
+        start = time.monotonic()
+        response = self.client.get(self.product.get_absolute_url())
+
+        assert response.status_code == 200
+        assert b"Product" in response.content
+        assert time.monotonic() - start < 1
+
+    def test_cart_detail(self):
+        self.client.post(
+            f"/en/cart/add/{self.product.id}/", {"quantity": 1}
+        )
+
+        start = time.monotonic()
+        response = self.client.get("/en/cart/")
+
+        assert response.status_code == 200
+        assert len(response.context["cart"]) == 1
+        assert time.monotonic() - start < 1